@@ -1,7 +1,85 @@
-from numpy import expand_dims, repeat, swapaxes, abs, sum, where
+from asyncio import Semaphore, ensure_future, get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from hashlib import sha256
+from inspect import signature
+from itertools import combinations
+from json import dump, load as load_json
+from math import comb
+from os import cpu_count, makedirs, replace, environ
+from os.path import join, exists, expanduser, dirname
+from pathlib import PurePath
+from platform import platform, processor
+from threading import local, Lock
+from time import perf_counter
+from numpy import ndarray, asarray, load, zeros, empty, arange, array, expand_dims, sum, sqrt, iinfo, prod
+from numpy import not_equal, subtract, absolute, greater, int8, bitwise_or, stack, frombuffer, full, broadcast_shapes
+from numpy import multiply, logical_and, bitwise_and, int64
+from numpy import concatenate, flatnonzero, lexsort, partition, argpartition, take_along_axis, broadcast_to
+from numpy import argsort, searchsorted, repeat, cumsum, unique, eye, log2, bitwise_xor
+from numpy import packbits, pad, ascontiguousarray, uint8, uint64, delete, save, result_type, min_scalar_type
+from numpy import dtype as dtype_of, __version__ as numpy_version
+from numpy.lib.format import open_memmap
+from numpy.random import default_rng
 
+try:
+    from os import sysconf  # available memory of POSIX systems.
+except ImportError:
+    sysconf = None
 
-def hamming_group(observed_sample, sample_group, threshold=None):
+try:
+    from numpy import bitwise_count  # hardware population count, available since numpy 2.0.
+except ImportError:
+    bitwise_count = None
+
+
+# number of set bits for each byte value, used when 'numpy.bitwise_count' is unavailable.
+bit_counts = array([bin(value).count("1") for value in range(256)], dtype=uint8)
+
+# calibrations of this machine loaded in this process, see 'calibrate'.
+calibrations = {}
+
+# active profilers, see 'Profiler'.
+profilers = []
+
+# record of the profiled call in the current thread, shared with the workers of this call.
+tracing = local()
+
+
+def profiled(function):
+    """
+    Record the calls of the function in the active profilers, the function is called directly if no profiler is active.
+
+    :param function: calculation function.
+    :type function: function
+
+    :return: profiled function.
+    :rtype: function
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        if not profilers:
+            return function(*args, **kwargs)
+
+        record = CallRecord(function.__name__, signature(function).bind(*args, **kwargs).arguments)
+        previous, tracing.record = current_record(), record
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            tracing.record = previous
+
+        record.finish(result)
+        for profiler in list(profilers):
+            profiler.receive(record.export())
+
+        return result
+
+    return wrapper
+
+
+@profiled
+def hamming_group(observed_sample, sample_group, threshold=None, engine=None, n_jobs=1, out=None, dtype=None,
+                  max_distance=None, weights=None, observed_mask=None, group_mask=None, memory_limit=2 ** 27):
     """
     Calculate the Hamming distances between the observed sample and all the samples in sample group.
 
@@ -14,6 +92,35 @@ def hamming_group(observed_sample, sample_group, threshold=None):
     :param threshold: threshold for real number system.
     :type threshold: float or None
 
+    :param engine: calculation engine, "dense" (element-wise comparison), "packed" (bit-packed XOR and popcount),
+                   "sliced" (bit-sliced planes of small integers, XOR and popcount),
+                   or "auto" (the fastest one through the calibration of this machine).
+    :type engine: str or None
+
+    :param n_jobs: number of threads sharing the chunks of sample group, -1 refers to all the processors.
+    :type n_jobs: int
+
+    :param out: preallocated output array, the shape of which should be (sample number,).
+    :type out: numpy.ndarray or None
+
+    :param dtype: type of outputted distances (default is int), used if 'out' is None.
+    :type dtype: type or None
+
+    :param max_distance: maximum hamming distance of interest, the larger distances are outputted as 'max_distance' + 1.
+    :type max_distance: int or None
+
+    :param weights: non-negative weight of each variable, the shape of which should be (variable number,).
+    :type weights: numpy.ndarray or None
+
+    :param observed_mask: validity mask of observed sample (True refers to the valid variable).
+    :type observed_mask: numpy.ndarray or None
+
+    :param group_mask: validity mask of sample group with the same shape as the sample group.
+    :type group_mask: numpy.ndarray or None
+
+    :param memory_limit: approximate memory budget (bytes) of the temporary tensors of one chunk.
+    :type memory_limit: int
+
     :return: hamming distance array between the observed sample and sample group.
     :rtype: numpy.ndarray
 
@@ -24,6 +131,11 @@ def hamming_group(observed_sample, sample_group, threshold=None):
         >>> sample_group = array([[1, 1, 0], [0, 1, 1], [0, 1, 0]])
         >>> hamming_group(observed_sample=sample, sample_group=sample_group, threshold=None)
         array([1, 1, 0])
+        >>> hamming_group(observed_sample=array([0, 1, 0]), sample_group=array([[1, 0, 1], [0, 1, 1]]), max_distance=1)
+        array([2, 1])
+        >>> hamming_group(observed_sample=sample, sample_group=sample_group, weights=array([0.5, 1.0, 2.0]),
+        ...               group_mask=array([[True, True, True], [True, True, False], [True, True, True]]))
+        array([0.5, 0. , 0. ])
         >>> sample = array([0.2, 0.5, 0.8])
         >>> sample_group = array([[0.7, 0.1, 0.2], [0.3, 0.4, 0.7], [0.9, 0.2, 0.4]])
         >>> hamming_group(observed_sample=sample, sample_group=sample_group, threshold=0.4)
@@ -31,23 +143,62 @@ def hamming_group(observed_sample, sample_group, threshold=None):
 
     .. note:
         The variable number of parameter 'observed_sample' and 'sample_group' should be equal.
+
+        If 'engine' is None, the "dense" engine is chosen, since packing or slicing the group costs more than
+        comparing it once. The index encodes the group only once, see 'HammingIndex'.
+        If 'engine' is "auto", the fastest engine for the inputs is chosen through the calibration of this machine,
+        see 'calibrate'.
+
+        The strings (or bytes) are accepted as the samples, see 'encode_sequences'.
+
+        If 'max_distance' is not None, the variables are calculated block by block (256 variables per block),
+        and the samples whose partial distances already exceed 'max_distance' are dropped from the later blocks.
+
+        If 'weights' or the masks are not None, each different variable is counted as its weight (default is 1)
+        only if it is valid in both samples. The masks are bit-packed for the "packed" and "sliced" engines,
+        and the weights are only supported by the "dense" engine.
     """
+    observed_sample, sample_group = as_samples(observed_sample), as_samples(sample_group)
+    check_variables(observed_sample, sample_group)
+    weights = prepare_weights(weights, sample_group.shape[-1])
+    observed_mask, group_mask = prepare_mask(observed_mask, observed_sample), prepare_mask(group_mask, sample_group)
 
-    sample = expand_dims(observed_sample, axis=0)
+    used_engine = select_engine(engine, threshold, observed_sample, sample_group, weighted=weights is not None)
+    bits = count_bits(observed_sample, sample_group) if used_engine == "sliced" else None
+    workers = count_workers(n_jobs)
 
-    matrix = abs(sample_group - sample)
+    record = current_record()
+    if record is not None:
+        record.annotate(engine=used_engine, workers=workers)
 
-    if threshold is None:
-        matrix = matrix.astype(bool)  # set bool for illustrating the difference flag rapidly.
-    else:
-        matrix = where(matrix > threshold, 1, 0)   # use 'where' function for real number system with threshold.
+    sample = expand_dims(encode_samples(observed_sample, used_engine, bits), axis=0)
+    sample_mask = None if observed_mask is None else expand_dims(encode_mask(observed_mask, used_engine), axis=0)
 
-    distances = sum(matrix, axis=1)
+    if weights is not None and dtype is None:
+        dtype = result_type(weights, int)
+
+    distances = prepare_output(out, (len(sample_group),), dtype,
+                               sample_group.shape[-1] if weights is None else weights.sum())
+
+    def fill(start, stop):
+        # the chunk (and its mask) is encoded inside the task, so that the encoding is also shared by the workers.
+        chunk = encode_samples(sample_group[start: stop], used_engine, bits)
+        chunk_mask = None if group_mask is None else encode_mask(group_mask[start: stop], used_engine)
+        hamming_tile(sample, chunk, threshold, used_engine, out=expand_dims(distances[start: stop], axis=0),
+                     max_distance=max_distance, masks=(sample_mask, chunk_mask), weights=weights)
+
+    # the chunk is bounded by the memory budget (the same as a tile of 'hamming_matrix'), and shared by the workers.
+    chunk_size = min(choose_block_size(int(prod(sample.shape[1:])), memory_limit) ** 2,
+                     -(-len(sample_group) // workers))
+    execute(fill, block_ranges(len(sample_group), chunk_size), workers)
 
     return distances
 
 
-def hamming_matrix(samples, other_samples=None, threshold=None):
+@profiled
+def hamming_matrix(samples, other_samples=None, threshold=None, engine=None, block_size=None, memory_limit=2 ** 27,
+                   n_jobs=1, condensed=False, out=None, dtype=None, max_distance=None, weights=None, masks=None,
+                   other_masks=None):
     """
     Calculate hamming matrix between samples.
 
@@ -60,6 +211,42 @@ def hamming_matrix(samples, other_samples=None, threshold=None):
     :param threshold: threshold for real number system.
     :type threshold: float or None
 
+    :param engine: calculation engine, "dense" (element-wise comparison), "packed" (bit-packed XOR and popcount),
+                   "sliced" (bit-sliced planes of small integers, XOR and popcount),
+                   or "auto" (the fastest one through the calibration of this machine).
+    :type engine: str or None
+
+    :param block_size: number of samples in each side of the square tile.
+    :type block_size: int or None
+
+    :param memory_limit: approximate memory budget (bytes) of one tile, used if 'block_size' is None.
+    :type memory_limit: int
+
+    :param n_jobs: number of threads sharing the row blocks of matrix, -1 refers to all the processors.
+    :type n_jobs: int
+
+    :param condensed: return the condensed upper triangle (the format of 'scipy.spatial.distance.pdist') instead,
+                      only available when 'other_samples' is None.
+    :type condensed: bool
+
+    :param out: preallocated output array, the shape of which should be the same as the outputted matrix.
+    :type out: numpy.ndarray or None
+
+    :param dtype: type of outputted matrix (default is int), used if 'out' is None.
+    :type dtype: type or None
+
+    :param max_distance: maximum hamming distance of interest, the larger distances are outputted as 'max_distance' + 1.
+    :type max_distance: int or None
+
+    :param weights: non-negative weight of each variable, the shape of which should be (variable number,).
+    :type weights: numpy.ndarray or None
+
+    :param masks: validity masks of samples (True refers to the valid variable) with the same shape as the samples.
+    :type masks: numpy.ndarray or None
+
+    :param other_masks: validity masks of other samples with the same shape as the other samples.
+    :type other_masks: numpy.ndarray or None
+
     :return: hamming distance matrix of samples.
     :rtype: numpy.ndarray
 
@@ -76,11 +263,21 @@ def hamming_matrix(samples, other_samples=None, threshold=None):
         array([[3, 2],
                [1, 2],
                [2, 3]])
+        >>> hamming_matrix(samples=samples_1, other_samples=samples_2, max_distance=1)
+        array([[2, 2],
+               [1, 2],
+               [2, 2]])
+        >>> hamming_matrix(samples=samples_1, masks=array([[1, 1, 1], [1, 1, 0], [0, 1, 1]]))
+        array([[0, 1, 0],
+               [1, 0, 0],
+               [0, 0, 0]])
         >>> samples_1 = array([[0.7, 0.1, 0.2], [0.3, 0.4, 0.7], [0.9, 0.2, 0.4]])
         >>> hamming_matrix(samples=samples_1, threshold=0.4)
         array([[0, 1, 0],
                [1, 0, 1],
                [0, 1, 0]])
+        >>> hamming_matrix(samples=samples_1, threshold=0.4, condensed=True)
+        array([1, 0, 1])
         >>> samples_2 = array([[0.6, 0.7, 0.8], [0.5, 0.9, 0.1]])
         >>> hamming_matrix(samples=samples_1, other_samples=samples_2, threshold=0.4)
         array([[2, 1],
@@ -92,24 +289,2718 @@ def hamming_matrix(samples, other_samples=None, threshold=None):
 
         If 'other_samples' is None, the shape of outputted matrix is (sample number, sample number).
         Otherwise, that of outputted matrix is (sample number, other sample number).
+
+        The matrix is filled tile by tile, so the peak memory is the outputted matrix plus one tile.
+        If 'other_samples' is None, only the tiles in the upper triangle are calculated and then mirrored.
+        The length of condensed matrix is sample number * (sample number - 1) / 2.
+
+        If 'engine' is None, the "packed" engine is chosen when both inputs only contain 0 and 1 without threshold,
+        and the "sliced" engine is chosen when both inputs only contain small non-negative integers (0 ~ 15)
+        with at least 256 variables, below which slicing the bit planes costs more than the comparison saves.
+        Otherwise, the "dense" engine is chosen.
+        If 'engine' is "auto", the fastest engine for the inputs is chosen through the calibration of this machine,
+        see 'calibrate'. The tile budget is also chosen through the calibration,
+        which is not larger than 'memory_limit' and half of the available memory shared by the workers.
+
+        The strings (or bytes) are accepted as the samples, see 'encode_sequences'.
+
+        If 'max_distance' is not None, the variables are calculated block by block (256 variables per block),
+        and the pairs whose partial distances already exceed 'max_distance' are dropped from the later blocks.
+
+        If 'weights' or the masks are not None, each different variable is counted as its weight (default is 1)
+        only if it is valid in both samples. The masks are bit-packed for the "packed" and "sliced" engines,
+        and the weights are only supported by the "dense" engine.
     """
+    samples = as_samples(samples)
+    weights = prepare_weights(weights, samples.shape[-1])
+    masks = prepare_mask(masks, samples)
+
+    if other_samples is None and other_masks is not None:
+        raise ValueError("'other_masks' is only available when 'other_samples' is not None.")
 
-    # prepare for the cross subtraction for samples or two sample groups.
+    used_engine, former, latter = prepare_samples(samples, other_samples, threshold, engine,
+                                                  weighted=weights is not None)
+
+    former_mask = None if masks is None else encode_mask(masks, used_engine)
     if other_samples is None:
-        former = repeat(expand_dims(samples, 0), len(samples), 0)
-        latter = swapaxes(former.copy(), 0, 1)
+        latter_mask = former_mask
     else:
-        former = repeat(expand_dims(other_samples, 0), len(samples), 0)
-        latter = swapaxes(repeat(expand_dims(samples, 0), len(other_samples), 0), 0, 1)
+        other_masks = prepare_mask(other_masks, as_samples(other_samples))
+        latter_mask = None if other_masks is None else encode_mask(other_masks, used_engine)
 
-    # do cross subtraction to define the actual difference between any two samples in the same position.
-    matrix = abs(former - latter)
+    if weights is not None and dtype is None:
+        dtype = result_type(weights, int)
+    maximum = samples.shape[-1] if weights is None else weights.sum()
 
-    if threshold is None:
-        matrix = matrix.astype(bool)  # set bool for illustrating the difference flag rapidly.
+    if block_size is None:
+        if engine == "auto":
+            memory_limit = tune_memory_limit(used_engine, former, memory_limit, count_workers(n_jobs))
+        block_size = choose_block_size(int(prod(former.shape[1:])), memory_limit)
+
+    record = current_record()
+    if record is not None:
+        record.annotate(engine=used_engine, block_size=block_size, workers=count_workers(n_jobs))
+
+    if other_samples is None:
+        if condensed:
+            matrix = prepare_output(out, (len(former) * (len(former) - 1) // 2,), dtype, maximum)
+        else:
+            matrix = prepare_output(out, (len(former), len(former)), dtype, maximum)
+        return symmetric_matrix(former, threshold, used_engine, block_size, count_workers(n_jobs), matrix, condensed,
+                                max_distance=max_distance, masks=former_mask, weights=weights)
+
+    if condensed:
+        raise ValueError("the condensed matrix is only available when 'other_samples' is None.")
+
+    matrix = prepare_output(out, (len(former), len(latter)), dtype, maximum)
+
+    return tiled_matrix(former, latter, threshold, used_engine, block_size, count_workers(n_jobs), matrix,
+                        max_distance=max_distance, masks=(former_mask, latter_mask), weights=weights)
+
+
+def tiled_matrix(former, latter, threshold, engine, block_size, workers, matrix, max_distance=None, masks=None,
+                 weights=None):
+    """
+    Calculate hamming matrix between two sample groups tile by tile.
+
+    :param former: two-dimensional sample array (or packed array), the shape of which could be (row number, width).
+    :type former: numpy.ndarray
+
+    :param latter: two-dimensional sample array (or packed array), the shape of which could be (column number, width).
+    :type latter: numpy.ndarray
+
+    :param threshold: threshold for real number system.
+    :type threshold: float or None
+
+    :param engine: calculation engine, "dense", "packed" or "sliced".
+    :type engine: str
+
+    :param block_size: number of samples in each side of the square tile.
+    :type block_size: int
+
+    :param workers: number of workers.
+    :type workers: int
+
+    :param matrix: output array, the shape of which is (row number, column number).
+    :type matrix: numpy.ndarray
+
+    :param max_distance: maximum hamming distance of interest, the larger distances are outputted as 'max_distance' + 1.
+    :type max_distance: int or None
+
+    :param masks: encoded validity masks of former and latter samples (each of them could be None), or None.
+    :type masks: tuple or None
+
+    :param weights: non-negative weight of each variable, or None.
+    :type weights: numpy.ndarray or None
+
+    :return: hamming distance matrix, the shape of which is (row number, column number).
+    :rtype: numpy.ndarray
+    """
+    former_mask, latter_mask = (None, None) if masks is None else masks
+
+    # fill the matrix tile by tile, so that each worker only holds one (block size, block size, width) tensor.
+    def fill(row_start, row_stop):
+        buffers = {}  # the temporary tensors are reused by the tiles of this row block.
+        for column_start, column_stop in block_ranges(len(latter), block_size):
+            hamming_tile(former[row_start: row_stop], latter[column_start: column_stop], threshold, engine,
+                         out=matrix[row_start: row_stop, column_start: column_stop], buffers=buffers,
+                         max_distance=max_distance, weights=weights,
+                         masks=(take_rows(former_mask, row_start, row_stop),
+                                take_rows(latter_mask, column_start, column_stop)))
+
+    execute(fill, block_ranges(len(former), block_size), workers)
+
+    return matrix
+
+
+def symmetric_matrix(samples, threshold, engine, block_size, workers, matrix, condensed, row_range=None,
+                     max_distance=None, masks=None, weights=None):
+    """
+    Calculate hamming matrix of samples through the tiles in the upper triangle.
+
+    :param samples: two-dimensional sample array (or packed array), the shape of which could be (sample number, width).
+    :type samples: numpy.ndarray
+
+    :param threshold: threshold for real number system.
+    :type threshold: float or None
+
+    :param engine: calculation engine, "dense", "packed" or "sliced".
+    :type engine: str
+
+    :param block_size: number of samples in each side of the square tile.
+    :type block_size: int
+
+    :param workers: number of workers.
+    :type workers: int
+
+    :param matrix: output array, the shape of which is (sample number, sample number) or the condensed one.
+    :type matrix: numpy.ndarray
+
+    :param condensed: return the condensed upper triangle instead of the square matrix.
+    :type condensed: bool
+
+    :param row_range: start and stop rows (aligned with the tiles) to be calculated, or None for all the rows.
+    :type row_range: tuple or None
+
+    :param max_distance: maximum hamming distance of interest, the larger distances are outputted as 'max_distance' + 1.
+    :type max_distance: int or None
+
+    :param masks: encoded validity masks of samples, or None.
+    :type masks: numpy.ndarray or None
+
+    :param weights: non-negative weight of each variable, or None.
+    :type weights: numpy.ndarray or None
+
+    :return: hamming distance matrix or its condensed upper triangle.
+    :rtype: numpy.ndarray
+
+    .. note::
+        If the row blocks are calculated in order, the rows before the current block are completed,
+        because the lower triangle of them are mirrored from the previous blocks.
+    """
+    total = len(samples)
+
+    def fill(row_start, row_stop):
+        buffers = {}  # the temporary tensors are reused by the tiles of this row block.
+        for column_start, column_stop in block_ranges(total, block_size):
+            if column_start < row_start:
+                continue  # the tiles are aligned, so this tile is in the lower triangle.
+
+            tile_masks = (take_rows(masks, row_start, row_stop), take_rows(masks, column_start, column_stop))
+            if condensed:
+                tile = hamming_tile(samples[row_start: row_stop], samples[column_start: column_stop], threshold,
+                                    engine, dtype=matrix.dtype, buffers=buffers, max_distance=max_distance,
+                                    masks=tile_masks, weights=weights)
+                rows = arange(row_start, row_stop).reshape(-1, 1)
+                columns = arange(column_start, column_stop).reshape(1, -1)
+                upper = columns > rows
+                # position of (i, j) in the condensed matrix, i.e. the same order as 'scipy.spatial.distance.pdist'.
+                positions = total * rows - rows * (rows + 1) // 2 + columns - rows - 1
+                matrix[positions[upper]] = tile[upper]
+            else:
+                tile = hamming_tile(samples[row_start: row_stop], samples[column_start: column_stop], threshold,
+                                    engine, out=matrix[row_start: row_stop, column_start: column_stop],
+                                    buffers=buffers, max_distance=max_distance, masks=tile_masks, weights=weights)
+                matrix[column_start: column_stop, row_start: row_stop] = tile.T
+
+    ranges = block_ranges(total, block_size)
+    if row_range is not None:
+        ranges = [(start, stop) for start, stop in ranges if row_range[0] <= start < row_range[1]]
+
+    execute(fill, ranges, workers)
+
+    return matrix
+
+
+def hamming_pairs(samples, other_samples=None, max_distance=0, threshold=None, engine=None, block_size=None,
+                  memory_limit=2 ** 27, n_jobs=1):
+    """
+    Find the sample pairs whose Hamming distances are not larger than the maximum distance.
+
+    :param samples: two-dimensional sample array, the shape of which could be (sample number, variable number).
+    :type samples: numpy.ndarray
+
+    :param other_samples: another two-dimensional sample array with above-mentioned shape.
+    :type other_samples: numpy.ndarray
+
+    :param max_distance: maximum hamming distance of the found pairs.
+    :type max_distance: int
+
+    :param threshold: threshold for real number system.
+    :type threshold: float or None
+
+    :param engine: calculation engine, "dense" (element-wise comparison), "packed" (bit-packed XOR and popcount)
+                   or "sliced" (bit-sliced planes of small integers, XOR and popcount).
+    :type engine: str or None
+
+    :param block_size: number of samples in each side of the square tile.
+    :type block_size: int or None
+
+    :param memory_limit: approximate memory budget (bytes) of one tile, used if 'block_size' is None.
+    :type memory_limit: int
+
+    :param n_jobs: number of threads sharing the row blocks, -1 refers to all the processors.
+    :type n_jobs: int
+
+    :return: row indices, column indices and hamming distances of the found pairs (coordinate format),
+             sorted by row index and then by column index.
+    :rtype: numpy.ndarray, numpy.ndarray, numpy.ndarray
+
+    Example
+        >>> from numpy import array
+        >>> from calculator import hamming_pairs
+        >>> samples_1 = array([[1, 1, 0], [0, 1, 1], [0, 1, 0]])
+        >>> hamming_pairs(samples=samples_1, max_distance=1)
+        (array([0, 1]), array([2, 2]), array([1, 1]))
+        >>> samples_2 = array([[0, 0, 1], [1, 0, 1]])
+        >>> hamming_pairs(samples=samples_1, other_samples=samples_2, max_distance=1)
+        (array([1]), array([0]), array([1]))
+
+    .. note::
+        If 'other_samples' is None, only the pairs (i, j) with i < j are found.
+        The distances are calculated tile by tile and only the found pairs are kept,
+        so the memory depends on the number of found pairs instead of the size of hamming matrix.
+    """
+    used_engine, former, latter = prepare_samples(samples, other_samples, threshold, engine)
+
+    if block_size is None:
+        block_size = choose_block_size(int(prod(former.shape[1:])), memory_limit)
+
+    results = {}
+
+    def fill(row_start, row_stop):
+        found, buffers = [], {}
+        for column_start, column_stop in block_ranges(len(latter), block_size):
+            if other_samples is None and column_stop <= row_start + 1:
+                continue  # no pair (i, j) with i < j in this tile.
+
+            tile = hamming_tile(former[row_start: row_stop], latter[column_start: column_stop], threshold,
+                                used_engine, buffers=buffers, max_distance=max_distance)
+            hits = tile <= max_distance
+            if other_samples is None and column_start < row_stop:
+                hits &= arange(column_start, column_stop).reshape(1, -1) > arange(row_start, row_stop).reshape(-1, 1)
+
+            rows, columns = hits.nonzero()
+            found.append((rows + row_start, columns + column_start, tile[rows, columns]))
+
+        results[row_start] = found
+
+    execute(fill, block_ranges(len(former), block_size), count_workers(n_jobs))
+
+    found = [triple for row_start in sorted(results) for triple in results[row_start]]
+    rows = concatenate([triple[0] for triple in found] + [zeros(shape=(0,), dtype=int)])
+    columns = concatenate([triple[1] for triple in found] + [zeros(shape=(0,), dtype=int)])
+    distances = concatenate([triple[2] for triple in found] + [zeros(shape=(0,), dtype=int)])
+
+    order = lexsort((columns, rows))  # sort by row index, then by column index.
+
+    return rows[order], columns[order], distances[order]
+
+
+def hamming_matrix_file(path, samples, other_samples=None, threshold=None, engine=None, block_size=None,
+                        memory_limit=2 ** 27, n_jobs=1, condensed=False, dtype=None):
+    """
+    Calculate hamming matrix between samples and write it into a '.npy' file, which can be resumed after interruption.
+
+    :param path: path of the '.npy' file.
+    :type path: str or pathlib.Path
+
+    :param samples: two-dimensional sample array, the shape of which could be (sample number, variable number).
+    :type samples: numpy.ndarray
+
+    :param other_samples: another two-dimensional sample array with above-mentioned shape.
+    :type other_samples: numpy.ndarray
+
+    :param threshold: threshold for real number system.
+    :type threshold: float or None
+
+    :param engine: calculation engine, "dense" (element-wise comparison), "packed" (bit-packed XOR and popcount)
+                   or "sliced" (bit-sliced planes of small integers, XOR and popcount).
+    :type engine: str or None
+
+    :param block_size: number of samples in each side of the square tile.
+    :type block_size: int or None
+
+    :param memory_limit: approximate memory budget (bytes) of one tile, used if 'block_size' is None.
+    :type memory_limit: int
+
+    :param n_jobs: number of threads sharing the row blocks of matrix, -1 refers to all the processors.
+    :type n_jobs: int
+
+    :param condensed: write the condensed upper triangle (the format of 'scipy.spatial.distance.pdist') instead,
+                      only available when 'other_samples' is None.
+    :type condensed: bool
+
+    :param dtype: type of outputted matrix (default is the smallest unsigned integer type holding the variable number).
+    :type dtype: type or None
+
+    :return: memory-mapped hamming distance matrix.
+    :rtype: numpy.memmap
+
+    Example
+        >>> from numpy import array
+        >>> from os.path import join
+        >>> from tempfile import TemporaryDirectory
+        >>> from calculator import hamming_matrix_file
+        >>> samples = array([[1, 1, 0], [0, 1, 1], [0, 1, 0]])
+        >>> with TemporaryDirectory() as folder:
+        ...     matrix = hamming_matrix_file(path=join(folder, "matrix.npy"), samples=samples, condensed=True)
+        ...     print(matrix.tolist())
+        ...     del matrix
+        [2, 1, 1]
+
+    .. note::
+        The progress is recorded in the checkpoint file (the path with '.checkpoint' suffix) after each stripe of rows.
+        If the calculation is interrupted, calling this function with the same parameters continues from the checkpoint.
+        The checkpoint file is kept after completion, so the repeated call returns the completed matrix directly.
+        The checkpoint records the digest of inputs, so the calculation restarts if the samples are changed.
+    """
+    samples = as_samples(samples)
+
+    used_engine, former, latter = prepare_samples(samples, other_samples, threshold, engine)
+
+    if condensed and other_samples is not None:
+        raise ValueError("the condensed matrix is only available when 'other_samples' is None.")
+
+    if block_size is None:
+        block_size = choose_block_size(int(prod(former.shape[1:])), memory_limit)
+
+    if condensed:
+        shape = (len(former) * (len(former) - 1) // 2,)
+    else:
+        shape = (len(former), len(latter))
+
+    if dtype is None:
+        dtype = min_scalar_type(samples.shape[-1])
+
+    # the checkpoint only accepts the calculation with the same settings and the same inputs.
+    arrays = [samples] if other_samples is None else [samples, as_samples(other_samples)]
+    settings = {"shape": list(shape), "dtype": str(dtype_of(dtype)), "threshold": threshold, "engine": used_engine,
+                "block_size": block_size, "condensed": condensed, "symmetric": other_samples is None,
+                "digest": digest(*arrays)}
+    checkpoint_path = str(path) + ".checkpoint"
+
+    completed = 0
+    if exists(checkpoint_path) and exists(path):
+        with open(checkpoint_path, "r") as file:
+            checkpoint = load_json(file)
+        if checkpoint["settings"] == settings:
+            completed = checkpoint["completed"]
+
+    if completed > 0:
+        matrix = open_memmap(path, mode="r+")
     else:
-        matrix = where(matrix > threshold, 1, 0)   # use 'where' function for real number system with threshold.
+        matrix = open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+    prepare_output(matrix, shape, None, samples.shape[-1])
+
+    workers = count_workers(n_jobs)
+    for stripe_start in range(completed, len(former), block_size * workers):
+        stripe_stop = min(stripe_start + block_size * workers, len(former))
 
-    matrix = sum(matrix, axis=2, dtype=int)  # calculate hamming distances.
+        if other_samples is None:
+            symmetric_matrix(former, threshold, used_engine, block_size, workers, matrix, condensed,
+                             (stripe_start, stripe_stop))
+        else:
+            tiled_matrix(former[stripe_start: stripe_stop], latter, threshold, used_engine, block_size, workers,
+                         matrix[stripe_start: stripe_stop])
+
+        matrix.flush()
+
+        # replace the checkpoint atomically, so that an interruption does not leave a broken checkpoint.
+        with open(checkpoint_path + ".temp", "w") as file:
+            dump({"settings": settings, "completed": stripe_stop}, file)
+        replace(checkpoint_path + ".temp", checkpoint_path)
 
     return matrix
+
+
+def hamming_stream(observed_sample, sample_group, threshold=None, engine=None, chunk_size=None, memory_limit=2 ** 27):
+    """
+    Calculate the Hamming distances between the observed sample and the sample group chunk by chunk.
+
+    :param observed_sample: one-dimensional variable array, the shape of which could be (variable number,).
+    :type observed_sample: numpy.ndarray
+
+    :param sample_group: two-dimensional variable array (including numpy.memmap), path of '.npy' file,
+                         or iterable of two-dimensional row chunks.
+    :type sample_group: numpy.ndarray or str or pathlib.Path or iterable
+
+    :param threshold: threshold for real number system.
+    :type threshold: float or None
+
+    :param engine: calculation engine, "dense" (element-wise comparison), "packed" (bit-packed XOR and popcount)
+                   or "sliced" (bit-sliced planes of small integers, XOR and popcount).
+    :type engine: str or None
+
+    :param chunk_size: maximum number of samples in each chunk.
+    :type chunk_size: int or None
+
+    :param memory_limit: approximate memory budget (bytes) of one chunk, used if 'chunk_size' is None.
+    :type memory_limit: int
+
+    :return: generator of hamming distance arrays, each of which belongs to a chunk of sample group in order.
+    :rtype: generator
+
+    Example
+        >>> from numpy import array, concatenate
+        >>> from calculator import hamming_stream
+        >>> sample = array([0, 1, 0])
+        >>> sample_group = array([[1, 1, 0], [0, 1, 1], [0, 1, 0]])
+        >>> concatenate(list(hamming_stream(observed_sample=sample, sample_group=sample_group, chunk_size=2)))
+        array([1, 1, 0])
+
+    .. note::
+        Only one chunk of sample group is loaded at a time, so the peak memory does not depend on the sample number.
+        For the '.npy' file, the sample group is memory-mapped in the read-only mode.
+    """
+    observed_sample = as_samples(observed_sample)
+
+    if chunk_size is None:
+        chunk_size = max(1, memory_limit // (max(len(observed_sample), 1) * 8))
+
+    for chunk in iterate_chunks(sample_group, chunk_size):
+        yield hamming_group(observed_sample, chunk, threshold, engine)
+
+
+def hamming_topk(observed_sample, sample_group, k, threshold=None, engine=None, chunk_size=None,
+                 memory_limit=2 ** 27):
+    """
+    Find the k nearest samples of the observed sample in the sample group.
+
+    :param observed_sample: one-dimensional variable array, the shape of which could be (variable number,).
+    :type observed_sample: numpy.ndarray
+
+    :param sample_group: two-dimensional variable array (including numpy.memmap), path of '.npy' file,
+                         or iterable of two-dimensional row chunks.
+    :type sample_group: numpy.ndarray or str or pathlib.Path or iterable
+
+    :param k: number of nearest samples.
+    :type k: int
+
+    :param threshold: threshold for real number system.
+    :type threshold: float or None
+
+    :param engine: calculation engine, "dense" (element-wise comparison), "packed" (bit-packed XOR and popcount)
+                   or "sliced" (bit-sliced planes of small integers, XOR and popcount).
+    :type engine: str or None
+
+    :param chunk_size: maximum number of samples in each chunk.
+    :type chunk_size: int or None
+
+    :param memory_limit: approximate memory budget (bytes) of one chunk, used if 'chunk_size' is None.
+    :type memory_limit: int
+
+    :return: indices of the nearest samples and their hamming distances, sorted by distance (then by index).
+    :rtype: numpy.ndarray, numpy.ndarray
+
+    Example
+        >>> from numpy import array
+        >>> from calculator import hamming_topk
+        >>> sample = array([0, 1, 0])
+        >>> sample_group = array([[1, 1, 0], [0, 1, 1], [0, 1, 0], [1, 0, 1]])
+        >>> hamming_topk(observed_sample=sample, sample_group=sample_group, k=2)
+        (array([2, 0]), array([0, 1]))
+
+    .. note::
+        The distances of each chunk are reduced by partial selection, so the full distance array is never kept.
+        The iteration stops early once k samples with zero distance have been found.
+    """
+    if k <= 0:
+        raise ValueError("k should be positive, but got " + str(k) + ".")
+
+    indices, distances = zeros(shape=(0,), dtype=int), zeros(shape=(0,), dtype=int)
+
+    offset = 0
+    for chunk_distances in hamming_stream(observed_sample, sample_group, threshold, engine, chunk_size, memory_limit):
+        positions = select_smallest(chunk_distances, k)
+        indices = concatenate((indices, positions + offset))
+        distances = concatenate((distances, chunk_distances[positions]))
+
+        order = lexsort((indices, distances))[:k]  # sort by distance, then by index.
+        indices, distances = indices[order], distances[order]
+
+        offset += len(chunk_distances)
+
+        if len(distances) == k and distances[-1] == 0:
+            break  # the later samples cannot be nearer.
+
+    return indices, distances
+
+
+def hamming_within(observed_sample, sample_group, radius, threshold=None, engine=None, chunk_size=None,
+                   memory_limit=2 ** 27):
+    """
+    Find the samples whose Hamming distances to the observed sample are not larger than the radius.
+
+    :param observed_sample: one-dimensional variable array, the shape of which could be (variable number,).
+    :type observed_sample: numpy.ndarray
+
+    :param sample_group: two-dimensional variable array (including numpy.memmap), path of '.npy' file,
+                         or iterable of two-dimensional row chunks.
+    :type sample_group: numpy.ndarray or str or pathlib.Path or iterable
+
+    :param radius: maximum hamming distance.
+    :type radius: int
+
+    :param threshold: threshold for real number system.
+    :type threshold: float or None
+
+    :param engine: calculation engine, "dense" (element-wise comparison), "packed" (bit-packed XOR and popcount)
+                   or "sliced" (bit-sliced planes of small integers, XOR and popcount).
+    :type engine: str or None
+
+    :param chunk_size: maximum number of samples in each chunk.
+    :type chunk_size: int or None
+
+    :param memory_limit: approximate memory budget (bytes) of one chunk, used if 'chunk_size' is None.
+    :type memory_limit: int
+
+    :return: indices of the found samples and their hamming distances, sorted by index.
+    :rtype: numpy.ndarray, numpy.ndarray
+
+    Example
+        >>> from numpy import array
+        >>> from calculator import hamming_within
+        >>> sample = array([0, 1, 0])
+        >>> sample_group = array([[1, 1, 0], [0, 1, 1], [0, 1, 0], [1, 0, 1]])
+        >>> hamming_within(observed_sample=sample, sample_group=sample_group, radius=1)
+        (array([0, 1, 2]), array([1, 1, 0]))
+    """
+    indices, distances = [zeros(shape=(0,), dtype=int)], [zeros(shape=(0,), dtype=int)]
+
+    offset = 0
+    for chunk_distances in hamming_stream(observed_sample, sample_group, threshold, engine, chunk_size, memory_limit):
+        positions = flatnonzero(chunk_distances <= radius)
+        indices.append(positions + offset)
+        distances.append(chunk_distances[positions])
+        offset += len(chunk_distances)
+
+    return concatenate(indices), concatenate(distances)
+
+
+def hamming_batch(observed_samples, sample_group, k=None, threshold=None, engine=None, chunk_size=None,
+                  memory_limit=2 ** 27, n_jobs=1):
+    """
+    Calculate the Hamming distances between many observed samples and the sample group in one pass.
+
+    :param observed_samples: two-dimensional variable array, the shape of which is (query number, variable number).
+    :type observed_samples: numpy.ndarray
+
+    :param sample_group: two-dimensional variable array (including numpy.memmap), path of '.npy' file,
+                         or iterable of two-dimensional row chunks.
+    :type sample_group: numpy.ndarray or str or pathlib.Path or iterable
+
+    :param k: number of nearest samples for each observed sample, or None for all the distances.
+    :type k: int or None
+
+    :param threshold: threshold for real number system.
+    :type threshold: float or None
+
+    :param engine: calculation engine, "dense" (element-wise comparison), "packed" (bit-packed XOR and popcount)
+                   or "sliced" (bit-sliced planes of small integers, XOR and popcount).
+    :type engine: str or None
+
+    :param chunk_size: maximum number of samples in each chunk of sample group.
+    :type chunk_size: int or None
+
+    :param memory_limit: approximate memory budget (bytes) of one tile.
+    :type memory_limit: int
+
+    :param n_jobs: number of threads sharing the blocks of observed samples, -1 refers to all the processors.
+    :type n_jobs: int
+
+    :return: hamming distance matrix with the shape of (query number, sample number) if 'k' is None.
+             Otherwise, indices and hamming distances of the nearest samples with the shape of (query number, k),
+             sorted by distance (then by index).
+    :rtype: numpy.ndarray or (numpy.ndarray, numpy.ndarray)
+
+    Example
+        >>> from numpy import array
+        >>> from calculator import hamming_batch
+        >>> samples = array([[0, 1, 0], [1, 0, 1]])
+        >>> sample_group = array([[1, 1, 0], [0, 1, 1], [0, 1, 0], [1, 0, 1]])
+        >>> hamming_batch(observed_samples=samples, sample_group=sample_group)
+        array([[1, 1, 0, 3],
+               [2, 2, 3, 0]])
+        >>> hamming_batch(observed_samples=samples, sample_group=sample_group, k=2)
+        (array([[2, 0],
+               [3, 0]]), array([[0, 1],
+               [0, 2]]))
+
+    .. note::
+        Each chunk of sample group is loaded once for all the observed samples,
+        and the distances between the observed samples and the chunk are calculated tile by tile.
+    """
+    if k is not None and k <= 0:
+        raise ValueError("k should be positive, but got " + str(k) + ".")
+
+    observed_samples = as_samples(observed_samples)
+
+    if chunk_size is None:
+        chunk_size = choose_block_size(observed_samples.shape[-1], memory_limit) ** 2 // max(len(observed_samples), 1)
+
+    if k is None:
+        matrices = [zeros(shape=(len(observed_samples), 0), dtype=int)]
+    else:
+        indices = zeros(shape=(len(observed_samples), 0), dtype=int)
+        distances = zeros(shape=(len(observed_samples), 0), dtype=int)
+
+    offset = 0
+    for chunk in iterate_chunks(sample_group, max(1, chunk_size)):
+        matrix = hamming_matrix(observed_samples, chunk, threshold, engine, memory_limit=memory_limit, n_jobs=n_jobs)
+
+        if k is None:
+            matrices.append(matrix)
+
+        else:
+            indices, distances = merge_nearest(indices, distances, matrix, offset, k)
+            if distances.shape[1] == k and (distances.size == 0 or distances.max() == 0):
+                break  # the later samples cannot be nearer for any observed sample.
+
+        offset += len(chunk)
+
+    if k is None:
+        return concatenate(matrices, axis=1)
+
+    return indices, distances
+
+
+class DistanceMatrix(object):
+
+    def __init__(self, samples, threshold=None, engine=None, block_size=None, memory_limit=2 ** 27, n_jobs=1,
+                 dtype=None):
+        """
+        Initialize the hamming matrix of samples, which is updated (instead of rebuilt) when the samples change.
+
+        :param samples: two-dimensional variable array, the shape of which is (sample number, variable number).
+        :type samples: numpy.ndarray
+
+        :param threshold: threshold for real number system.
+        :type threshold: float or None
+
+        :param engine: calculation engine, "dense" (element-wise comparison), "packed" (bit-packed XOR and popcount)
+                       or "sliced" (bit-sliced planes of small integers, XOR and popcount).
+        :type engine: str or None
+
+        :param block_size: number of samples in each side of the square tile.
+        :type block_size: int or None
+
+        :param memory_limit: approximate memory budget (bytes) of one tile, used if 'block_size' is None.
+        :type memory_limit: int
+
+        :param n_jobs: number of threads sharing the row blocks, -1 refers to all the processors.
+        :type n_jobs: int
+
+        :param dtype: type of hamming matrix (default is int).
+        :type dtype: type or None
+
+        Example
+            >>> from numpy import array
+            >>> from calculator import DistanceMatrix
+            >>> distance_matrix = DistanceMatrix(samples=array([[1, 1, 0], [0, 1, 1]]))
+            >>> distance_matrix.append(samples=array([[0, 1, 0]]))
+            >>> distance_matrix.matrix
+            array([[0, 2, 1],
+                   [2, 0, 1],
+                   [1, 1, 0]])
+            >>> distance_matrix.remove(indices=[0])
+            >>> distance_matrix.matrix
+            array([[0, 1],
+                   [1, 0]])
+
+        .. note::
+            The matrix and samples are stored in the buffers with spare capacity (doubled when full),
+            so appending k samples only calculates the k new rows (and mirrors them as the new columns),
+            and removing samples only compacts the remaining rows and columns in place.
+        """
+        samples = as_samples(samples)
+        self.threshold = threshold
+        self.engine = engine
+        self.variable_number = samples.shape[1]
+        self.block_size = block_size
+        self.memory_limit = memory_limit
+        self.n_jobs = n_jobs
+        self.size = 0
+        self.sample_buffer = empty(shape=(0, self.variable_number), dtype=samples.dtype)
+        self.matrix_buffer = prepare_output(None, (0, 0), dtype, self.variable_number)
+        self.append(samples)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def matrix(self):
+        """
+        Hamming matrix of the current samples.
+
+        :return: hamming matrix, the shape of which is (sample number, sample number).
+        :rtype: numpy.ndarray
+        """
+        return self.matrix_buffer[:self.size, :self.size]
+
+    @property
+    def samples(self):
+        """
+        Current samples.
+
+        :return: two-dimensional variable array, the shape of which is (sample number, variable number).
+        :rtype: numpy.ndarray
+        """
+        return self.sample_buffer[:self.size]
+
+    def reserve(self, capacity, dtype=None):
+        """
+        Enlarge the buffers (at least doubled) if their capacity is smaller than the required one.
+
+        :param capacity: required number of samples.
+        :type capacity: int
+
+        :param dtype: required type of samples, which is promoted with the current one.
+        :type dtype: type or None
+        """
+        sample_type = self.sample_buffer.dtype if dtype is None else result_type(self.sample_buffer.dtype, dtype)
+
+        if capacity > len(self.matrix_buffer):
+            capacity = max(capacity, 2 * len(self.matrix_buffer))
+            matrix_buffer = prepare_output(None, (capacity, capacity), self.matrix_buffer.dtype, self.variable_number)
+            matrix_buffer[:self.size, :self.size] = self.matrix
+            self.matrix_buffer = matrix_buffer
+        elif sample_type == self.sample_buffer.dtype:
+            return
+
+        sample_buffer = empty(shape=(len(self.matrix_buffer), self.variable_number), dtype=sample_type)
+        sample_buffer[:self.size] = self.samples
+        self.sample_buffer = sample_buffer
+
+    def append(self, samples):
+        """
+        Append the samples, and calculate their hamming distances to the current samples and each other.
+
+        :param samples: two-dimensional variable array, the shape of which could be (sample number, variable number).
+        :type samples: numpy.ndarray
+        """
+        samples = as_samples(samples)
+
+        if samples.ndim != 2 or samples.shape[1] != self.variable_number:
+            raise ValueError("the samples should have " + str(self.variable_number) + " variables, "
+                             + "but got the shape of " + str(samples.shape) + ".")
+
+        if len(samples) == 0:
+            return
+
+        start, stop = self.size, self.size + len(samples)
+        self.reserve(stop, samples.dtype)
+        self.sample_buffer[start: stop] = samples
+
+        parameters = {"threshold": self.threshold, "engine": self.engine, "block_size": self.block_size,
+                      "memory_limit": self.memory_limit, "n_jobs": self.n_jobs}
+        if start > 0:
+            hamming_matrix(samples, self.sample_buffer[:start], out=self.matrix_buffer[start: stop, :start],
+                           **parameters)
+            self.matrix_buffer[:start, start: stop] = self.matrix_buffer[start: stop, :start].T
+        hamming_matrix(samples, out=self.matrix_buffer[start: stop, start: stop], **parameters)
+
+        self.size = stop
+
+    def remove(self, indices):
+        """
+        Remove the samples, the indices of the subsequent samples are moved forward.
+
+        :param indices: indices of the removed samples.
+        :type indices: list or numpy.ndarray
+        """
+        positions = delete(arange(self.size), indices)
+
+        # the rows are compacted in place first, then the columns of the kept rows block by block,
+        # so the temporary copy is bounded by one block (about 1MB) instead of the whole kept matrix.
+        compact(self.matrix_buffer[:self.size, :self.size], positions)
+        row_bytes = max(self.size * self.matrix_buffer.itemsize, 1)
+        for start, stop in block_ranges(len(positions), 2 ** 20 // row_bytes):
+            self.matrix_buffer[start: stop, :len(positions)] = self.matrix_buffer[start: stop, positions]
+        compact(self.sample_buffer[:self.size], positions)
+        self.size = len(positions)
+
+
+class HammingIndex(object):
+
+    def __init__(self, sample_group, threshold=None, engine=None, block_size=None, memory_limit=2 ** 27, n_jobs=1):
+        """
+        Initialize the index, which encodes the sample group once for the repeated queries.
+
+        :param sample_group: two-dimensional variable array, the shape of which is (sample number, variable number).
+        :type sample_group: numpy.ndarray
+
+        :param threshold: threshold for real number system.
+        :type threshold: float or None
+
+        :param engine: calculation engine, "dense" (compact element), "packed" (bit-packed 64-bit words)
+                       or "sliced" (bit-sliced planes of small integers).
+        :type engine: str or None
+
+        :param block_size: number of samples in each side of the square tile.
+        :type block_size: int or None
+
+        :param memory_limit: approximate memory budget (bytes) of one tile, used if 'block_size' is None.
+        :type memory_limit: int
+
+        :param n_jobs: number of threads sharing the blocks of observed samples, -1 refers to all the processors.
+        :type n_jobs: int
+
+        Example
+            >>> from numpy import array
+            >>> from calculator import HammingIndex
+            >>> index = HammingIndex(sample_group=array([[1, 1, 0], [0, 1, 1], [0, 1, 0]]))
+            >>> index.query(observed_sample=array([0, 1, 0]))
+            array([1, 1, 0])
+            >>> index.add(samples=array([[1, 0, 1]]))
+            >>> index.topk(observed_sample=array([0, 1, 0]), k=2)
+            (array([2, 0]), array([0, 1]))
+            >>> index.remove(indices=[0, 1])
+            >>> index.query(observed_sample=array([0, 1, 0]))
+            array([0, 3])
+        """
+        sample_group = as_samples(sample_group)
+        self.threshold = threshold
+        self.engine = select_engine(engine, threshold, sample_group, reused=True)
+        self.bits = count_bits(sample_group) if self.engine == "sliced" else None
+        self.variable_number = sample_group.shape[1]
+        self.block_size = block_size
+        self.memory_limit = memory_limit
+        self.n_jobs = n_jobs
+        self.codes = self.encode(sample_group)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def encode(self, samples):
+        """
+        Encode the samples with the engine of index.
+
+        :param samples: two-dimensional variable array, the shape of which could be (sample number, variable number).
+        :type samples: numpy.ndarray
+
+        :return: packed array of binary samples, bit-sliced planes of small integers,
+                 or sample array with the most compact type.
+        :rtype: numpy.ndarray
+        """
+        samples = as_samples(samples)
+
+        if samples.shape[-1] != self.variable_number:
+            raise ValueError("the variable number should be " + str(self.variable_number) + ", "
+                             + "but got " + str(samples.shape[-1]) + ".")
+
+        if self.engine == "packed":
+            if not is_binary(samples):
+                raise ValueError("the index with \"packed\" engine only supports the samples containing 0 and 1.")
+            return pack(samples)
+
+        if self.engine == "sliced":
+            bits = count_bits(samples)
+            if bits is None or bits > self.bits:
+                raise ValueError("the index with \"sliced\" engine only supports the integers belonging to 0 ~ "
+                                 + str(2 ** self.bits - 1) + ".")
+            return slice_planes(samples, self.bits)
+
+        # the compact type is only used without threshold, where any inequality (even overflowed) means difference.
+        if self.threshold is None and samples.dtype.kind in "iu" and samples.size > 0:
+            return samples.astype(result_type(min_scalar_type(samples.min()), min_scalar_type(samples.max())))
+
+        return asarray(samples)
+
+    def query(self, observed_sample):
+        """
+        Calculate the Hamming distances between the observed sample and all the samples in index.
+
+        :param observed_sample: one-dimensional variable array, the shape of which could be (variable number,).
+        :type observed_sample: numpy.ndarray
+
+        :return: hamming distance array between the observed sample and the samples in index.
+        :rtype: numpy.ndarray
+        """
+        return self.batch_query(expand_dims(as_samples(observed_sample), axis=0))[0]
+
+    def topk(self, observed_sample, k):
+        """
+        Find the k nearest samples of the observed sample in index.
+
+        :param observed_sample: one-dimensional variable array, the shape of which could be (variable number,).
+        :type observed_sample: numpy.ndarray
+
+        :param k: number of nearest samples.
+        :type k: int
+
+        :return: indices of the nearest samples and their hamming distances, sorted by distance (then by index).
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+        indices, distances = self.batch_query(expand_dims(as_samples(observed_sample), axis=0), k)
+        return indices[0], distances[0]
+
+    def batch_query(self, observed_samples, k=None, encoded=False):
+        """
+        Calculate the Hamming distances between many observed samples and all the samples in index.
+
+        :param observed_samples: two-dimensional variable array, the shape of which is (query number, variable number).
+        :type observed_samples: numpy.ndarray
+
+        :param k: number of nearest samples for each observed sample, or None for all the distances.
+        :type k: int or None
+
+        :param encoded: the observed samples are already encoded by 'encode'.
+        :type encoded: bool
+
+        :return: hamming distance matrix with the shape of (query number, sample number) if 'k' is None.
+                 Otherwise, indices and hamming distances of the nearest samples with the shape of (query number, k).
+        :rtype: numpy.ndarray or (numpy.ndarray, numpy.ndarray)
+        """
+        if encoded:
+            queries = observed_samples
+        else:
+            queries = as_samples(observed_samples) if self.engine == "dense" else self.encode(observed_samples)
+
+        block_size = self.block_size
+        if block_size is None:
+            block_size = choose_block_size(int(prod(self.codes.shape[1:])), self.memory_limit)
+
+        if k is None:
+            matrix = prepare_output(None, (len(queries), len(self.codes)), None, self.variable_number)
+            return tiled_matrix(queries, self.codes, self.threshold, self.engine, block_size,
+                                count_workers(self.n_jobs), matrix)
+
+        if k <= 0:
+            raise ValueError("k should be positive, but got " + str(k) + ".")
+
+        indices = zeros(shape=(len(queries), 0), dtype=int)
+        distances = zeros(shape=(len(queries), 0), dtype=int)
+
+        for start, stop in block_ranges(len(self.codes), block_size ** 2 // max(len(queries), 1)):
+            matrix = prepare_output(None, (len(queries), stop - start), None, self.variable_number)
+            tiled_matrix(queries, self.codes[start: stop], self.threshold, self.engine, block_size,
+                         count_workers(self.n_jobs), matrix)
+            indices, distances = merge_nearest(indices, distances, matrix, start, k)
+            if distances.shape[1] == k and (distances.size == 0 or distances.max() == 0):
+                break  # the later samples cannot be nearer for any observed sample.
+
+        return indices, distances
+
+    def add(self, samples):
+        """
+        Add the samples to the end of index.
+
+        :param samples: two-dimensional variable array, the shape of which could be (sample number, variable number).
+        :type samples: numpy.ndarray
+        """
+        self.codes = concatenate((self.codes, self.encode(samples)))
+
+    def remove(self, indices):
+        """
+        Remove the samples from index, the indices of the subsequent samples are moved forward.
+
+        :param indices: indices of the removed samples.
+        :type indices: list or numpy.ndarray
+        """
+        self.codes = delete(self.codes, indices, axis=0)
+
+    def save(self, path):
+        """
+        Save the index to the folder.
+
+        :param path: folder path of index.
+        :type path: str or pathlib.Path
+        """
+        makedirs(path, exist_ok=True)
+        save(join(path, "codes.npy"), self.codes)
+        with open(join(path, "index.json"), "w") as file:
+            dump({"engine": self.engine, "threshold": self.threshold, "variable_number": self.variable_number,
+                  "bits": self.bits}, file)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r", block_size=None, memory_limit=2 ** 27, n_jobs=1):
+        """
+        Load the index from the folder.
+
+        :param path: folder path of index.
+        :type path: str or pathlib.Path
+
+        :param mmap_mode: memory-map mode of the encoded samples (see 'numpy.load'), or None for loading into memory.
+        :type mmap_mode: str or None
+
+        :param block_size: number of samples in each side of the square tile.
+        :type block_size: int or None
+
+        :param memory_limit: approximate memory budget (bytes) of one tile, used if 'block_size' is None.
+        :type memory_limit: int
+
+        :param n_jobs: number of threads sharing the blocks of observed samples, -1 refers to all the processors.
+        :type n_jobs: int
+
+        :return: loaded index.
+        :rtype: calculator.HammingIndex
+        """
+        with open(join(path, "index.json"), "r") as file:
+            information = load_json(file)
+
+        index = cls.__new__(cls)
+        index.threshold = information["threshold"]
+        index.engine = information["engine"]
+        index.bits = information.get("bits")
+        index.variable_number = information["variable_number"]
+        index.block_size = block_size
+        index.memory_limit = memory_limit
+        index.n_jobs = n_jobs
+        index.codes = load(join(path, "codes.npy"), mmap_mode=mmap_mode)
+
+        return index
+
+
+class MultiIndexHashing(object):
+
+    def __init__(self, sample_group, substring_number=None):
+        """
+        Initialize the multi-index hashing, which finds the binary samples within a radius without the linear scan.
+
+        :param sample_group: two-dimensional binary array, the shape of which is (sample number, variable number).
+        :type sample_group: numpy.ndarray
+
+        :param substring_number: number of disjoint substrings (hash tables) the variables are split into.
+        :type substring_number: int or None
+
+        Example
+            >>> from numpy import array
+            >>> from calculator import MultiIndexHashing
+            >>> searcher = MultiIndexHashing(sample_group=array([[1, 1, 0, 0], [0, 1, 1, 0], [0, 1, 0, 1]]))
+            >>> searcher.within(observed_sample=array([0, 1, 0, 0]), radius=1)
+            (array([0, 1, 2]), array([1, 1, 1]))
+
+        .. note::
+            If two samples are within the radius r, at least one of their m substrings is within the radius r // m.
+            Hence, only the buckets near the substrings of the observed sample are checked,
+            and the candidates are verified by the packed hamming distances.
+
+            If 'substring_number' is None, the length of substrings is about log2(sample number) (at most 64).
+        """
+        if not is_binary(sample_group):
+            raise ValueError("the multi-index hashing only supports the samples containing 0 and 1.")
+
+        variable_number = sample_group.shape[1]
+        self.variable_number = variable_number
+        if substring_number is None:
+            substring_number = variable_number // max(1, int(log2(max(len(sample_group), 2))))
+
+        substring_number = max(substring_number, -(-variable_number // 64), 1)
+        self.substrings = block_ranges(variable_number, -(-variable_number // substring_number))
+
+        self.codes = pack(sample_group)
+        self.tables = []
+        for start, stop in self.substrings:
+            keys = pack(sample_group[:, start: stop])[:, 0]
+            order = argsort(keys, kind="stable")
+            self.tables.append((keys[order], order))
+
+        self.flips = {}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def within(self, observed_sample, radius):
+        """
+        Find the samples whose Hamming distances to the observed sample are not larger than the radius.
+
+        :param observed_sample: one-dimensional binary array, the shape of which is (variable number,).
+        :type observed_sample: numpy.ndarray
+
+        :param radius: maximum hamming distance.
+        :type radius: int
+
+        :return: indices of the found samples and their hamming distances, sorted by index.
+        :rtype: numpy.ndarray, numpy.ndarray
+
+        .. note::
+            If the buckets to be checked are more than the samples, the linear scan is used instead.
+        """
+        observed_sample = as_samples(observed_sample)
+
+        if observed_sample.shape != (self.variable_number,):
+            raise ValueError("the observed sample should have the shape of (" + str(self.variable_number)
+                             + ",), but got " + str(observed_sample.shape) + ".")
+
+        if not is_binary(observed_sample) and observed_sample.size > 0:
+            raise ValueError("the multi-index hashing only supports the samples containing 0 and 1.")
+
+        sample = pack(observed_sample)
+        sub_radius = radius // len(self.substrings)
+        flip_number = sum([comb(stop - start, value) for start, stop in self.substrings
+                           for value in range(min(sub_radius, stop - start) + 1)])
+
+        if radius < 0:
+            candidates = zeros(shape=(0,), dtype=int)
+        elif flip_number >= len(self.codes):
+            candidates = arange(len(self.codes))
+        else:
+            candidates = []
+            for (start, stop), (keys, order) in zip(self.substrings, self.tables):
+                probes = pack(observed_sample[start: stop])[0] ^ self.flip_masks(stop - start, sub_radius)
+                lefts, rights = searchsorted(keys, probes, side="left"), searchsorted(keys, probes, side="right")
+                counts = rights - lefts
+                # positions in the sorted keys of all the matched buckets.
+                positions = repeat(lefts - cumsum(counts) + counts, counts) + arange(sum(counts))
+                candidates.append(order[positions])
+            candidates = unique(concatenate(candidates))
+
+        distances = popcount(self.codes[candidates] ^ sample)
+        found = distances <= radius
+
+        return candidates[found], distances[found]
+
+    def flip_masks(self, length, sub_radius):
+        """
+        Get the masks which flip at most 'sub_radius' bits of the substring key.
+
+        :param length: number of variables in the substring.
+        :type length: int
+
+        :param sub_radius: maximum number of flipped bits.
+        :type sub_radius: int
+
+        :return: flip masks of the substring key.
+        :rtype: numpy.ndarray
+        """
+        if (length, sub_radius) not in self.flips:
+            bit_masks = pack(eye(length, dtype=bool))[:, 0]
+            masks = [zeros(shape=(1,), dtype=uint64)]
+            for value in range(1, min(sub_radius, length) + 1):
+                positions = array(list(combinations(range(length), value)))
+                masks.append(bitwise_xor.reduce(bit_masks[positions], axis=1))
+            self.flips[(length, sub_radius)] = concatenate(masks)
+
+        return self.flips[(length, sub_radius)]
+
+
+class HammingService(object):
+
+    def __init__(self, sample_group, threshold=None, engine=None, window=0.002, max_batch=256, max_pending=1024,
+                 executor=None, memory_limit=2 ** 27, n_jobs=1):
+        """
+        Initialize the asynchronous service, which coalesces the concurrent queries into the batched scans.
+
+        :param sample_group: two-dimensional variable array, the shape of which is (sample number, variable number).
+        :type sample_group: numpy.ndarray
+
+        :param threshold: threshold for real number system.
+        :type threshold: float or None
+
+        :param engine: calculation engine, "dense" (compact element), "packed" (bit-packed 64-bit words)
+                       or "sliced" (bit-sliced planes of small integers).
+        :type engine: str or None
+
+        :param window: seconds of waiting for the later queries after the first query of a batch.
+        :type window: float
+
+        :param max_batch: maximum number of queries in one batch, the full batch is scanned without waiting.
+        :type max_batch: int
+
+        :param max_pending: maximum number of queries waiting or being scanned, the later queries wait for a slot.
+        :type max_pending: int
+
+        :param executor: executor running the scans, or None for the default executor of the event loop.
+        :type executor: concurrent.futures.Executor or None
+
+        :param memory_limit: approximate memory budget (bytes) of one tile.
+        :type memory_limit: int
+
+        :param n_jobs: number of threads sharing the blocks of one batch, -1 refers to all the processors.
+        :type n_jobs: int
+
+        Example
+            >>> from asyncio import run
+            >>> from numpy import array
+            >>> from calculator import HammingService
+            >>> service = HammingService(sample_group=array([[1, 1, 0], [0, 1, 1], [0, 1, 0]]))
+            >>> run(service.query(observed_sample=array([0, 1, 0])))
+            array([1, 1, 0])
+            >>> run(service.query(observed_sample=array([0, 1, 0]), k=1))
+            (array([2]), array([0]))
+
+        .. note::
+            The sample group is encoded once (see 'HammingIndex'), and each batch is scanned in the executor,
+            so the event loop is never blocked by the calculation.
+            The cancelled queries are removed from their batch,
+            and the batch is skipped if all its queries are cancelled.
+            Each query is validated and encoded before joining a batch, so the invalid query raises its own error
+            without failing the other queries.
+        """
+        if window < 0:
+            raise ValueError("window should be non-negative, but got " + str(window) + ".")
+
+        if max_batch <= 0 or max_pending <= 0:
+            raise ValueError("max_batch and max_pending should be positive, "
+                             + "but got " + str(max_batch) + " and " + str(max_pending) + ".")
+
+        self.index = HammingIndex(sample_group, threshold, engine, memory_limit=memory_limit, n_jobs=n_jobs)
+        self.window = window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.executor = executor
+        self.semaphore = None  # created in the event loop of the first query.
+        self.pending = {}  # waiting queries of each 'k'.
+        self.timers = {}
+        self.tasks = set()
+        self.batch_number = 0
+
+    async def query(self, observed_sample, k=None):
+        """
+        Query the hamming distances between the observed sample and the sample group.
+
+        :param observed_sample: one-dimensional variable array, the shape of which could be (variable number,).
+        :type observed_sample: numpy.ndarray
+
+        :param k: number of nearest samples, or None for all the distances.
+        :type k: int or None
+
+        :return: hamming distance array if 'k' is None,
+                 otherwise indices and hamming distances of the nearest samples, sorted by distance (then by index).
+        :rtype: numpy.ndarray or (numpy.ndarray, numpy.ndarray)
+        """
+        observed_sample = as_samples(observed_sample)
+
+        if observed_sample.shape != (self.index.variable_number,):
+            raise ValueError("the observed sample should have the shape of (" + str(self.index.variable_number)
+                             + ",), but got " + str(observed_sample.shape) + ".")
+
+        if k is not None and k <= 0:
+            raise ValueError("k should be positive, but got " + str(k) + ".")
+
+        # the invalid sample is rejected here, instead of failing the other queries in its batch.
+        code = self.index.encode(expand_dims(observed_sample, axis=0))[0]
+
+        if self.semaphore is None:
+            self.semaphore = Semaphore(self.max_pending)
+
+        async with self.semaphore:
+            loop = get_running_loop()
+            future = loop.create_future()
+            self.pending.setdefault(k, []).append((code, future))
+
+            if len(self.pending[k]) >= self.max_batch:
+                self.flush(k)
+            elif k not in self.timers:
+                self.timers[k] = loop.call_later(self.window, self.flush, k)
+
+            return await future
+
+    def flush(self, k):
+        """
+        Start the batched scan of the waiting queries.
+
+        :param k: number of nearest samples of the queries, or None for all the distances.
+        :type k: int or None
+        """
+        if k in self.timers:
+            self.timers.pop(k).cancel()
+
+        batch = [(code, future) for code, future in self.pending.pop(k, []) if not future.done()]
+        if len(batch) > 0:
+            task = ensure_future(self.scan(batch, k))
+            self.tasks.add(task)  # keep the reference until the scan is finished.
+            task.add_done_callback(self.tasks.discard)
+
+    async def scan(self, batch, k):
+        """
+        Scan the sample group for the batch of queries in the executor.
+
+        :param batch: encoded observed samples and their futures.
+        :type batch: list
+
+        :param k: number of nearest samples of the queries, or None for all the distances.
+        :type k: int or None
+        """
+        self.batch_number += 1
+        try:
+            results = await get_running_loop().run_in_executor(self.executor, self.index.batch_query,
+                                                               stack([code for code, _ in batch]), k, True)
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for position, (_, future) in enumerate(batch):
+            if not future.done():  # the query could be cancelled during the scan.
+                future.set_result(results[position] if k is None else (results[0][position], results[1][position]))
+
+
+class Profiler(object):
+
+    def __init__(self, callback=None):
+        """
+        Initialize the profiler, which records the calls of 'hamming_group' and 'hamming_matrix' inside its context.
+
+        :param callback: function receiving each record (such as the exporter of metrics pipeline), or None.
+        :type callback: function or None
+
+        Example
+            >>> from numpy import array
+            >>> from calculator import hamming_matrix, Profiler
+            >>> with Profiler() as profiler:
+            ...     _ = hamming_matrix(samples=array([[1, 1, 0], [0, 1, 1], [0, 1, 0]], dtype=bool))
+            >>> record = profiler.records[0]
+            >>> record["function"], record["engine"], record["inputs"]["samples"]
+            ('hamming_matrix', 'packed', {'shape': [3, 3], 'dtype': 'bool'})
+            >>> sorted(record["phases"])
+            ['compare', 'encode', 'reduce']
+
+        .. note::
+            Each record contains the function name, the shapes and types of inputs, the other parameters,
+            the chosen engine (and the tile settings), the accumulated seconds of each phase
+            ("encode", "compare", "threshold", "mask" and "reduce", summed over the workers),
+            the bytes of allocated outputs and temporary tensors, the output shape and type, and the total seconds.
+
+            If no profiler is active, the only cost of each call (and each tile) is checking the empty profiler list.
+        """
+        self.callback = callback
+        self.records = []
+
+    def __enter__(self):
+        profilers.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        profilers.remove(self)
+
+    def receive(self, record):
+        """
+        Receive the record of one call.
+
+        :param record: record of one call.
+        :type record: dict
+        """
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def save(self, path):
+        """
+        Save the records as JSON.
+
+        :param path: path of the JSON log.
+        :type path: str or pathlib.Path
+        """
+        with open(path, "w") as file:
+            dump({"records": self.records}, file, indent=2)
+
+
+class CallRecord(object):
+
+    def __init__(self, function, arguments):
+        """
+        Initialize the record of one profiled call.
+
+        :param function: name of the called function.
+        :type function: str
+
+        :param arguments: bound arguments of the call.
+        :type arguments: dict
+        """
+        self.lock = Lock()  # the phases are accumulated by the workers in parallel.
+        self.information = {"function": function, "inputs": {}, "parameters": {}}
+        for name, value in arguments.items():
+            if isinstance(value, ndarray):
+                self.information["inputs"][name] = {"shape": list(value.shape), "dtype": str(value.dtype)}
+            elif value is None or isinstance(value, (bool, int, float)) or name == "engine":
+                self.information["parameters"][name] = value
+        self.phases = {}
+        self.allocated_bytes = 0
+        self.start = perf_counter()
+
+    def annotate(self, **values):
+        """
+        Annotate the record with the chosen settings, such as the engine.
+
+        :param values: chosen settings.
+        :type values: dict
+        """
+        self.information.update(values)
+
+    def add(self, phase, seconds):
+        """
+        Add the seconds of one phase.
+
+        :param phase: name of phase.
+        :type phase: str
+
+        :param seconds: spent seconds.
+        :type seconds: float
+        """
+        with self.lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def allocate(self, values):
+        """
+        Add the bytes of the allocated array.
+
+        :param values: allocated array.
+        :type values: numpy.ndarray
+        """
+        with self.lock:
+            self.allocated_bytes += values.nbytes
+
+    def finish(self, result):
+        """
+        Finish the record with the result of the call.
+
+        :param result: result of the call.
+        :type result: numpy.ndarray
+        """
+        self.information["total_seconds"] = perf_counter() - self.start
+        if isinstance(result, ndarray):
+            self.information["output"] = {"shape": list(result.shape), "dtype": str(result.dtype)}
+
+    def export(self):
+        """
+        Export the record.
+
+        :return: JSON-serializable record.
+        :rtype: dict
+        """
+        record = dict(self.information)
+        record.update({"phases": dict(self.phases), "allocated_bytes": self.allocated_bytes})
+        return record
+
+
+def merge_nearest(indices, distances, matrix, offset, k):
+    """
+    Merge the k nearest samples of a new chunk into the current k nearest samples of each observed sample.
+
+    :param indices: current indices of the nearest samples, the shape of which is (query number, current number).
+    :type indices: numpy.ndarray
+
+    :param distances: current hamming distances of the nearest samples, with the same shape as 'indices'.
+    :type distances: numpy.ndarray
+
+    :param matrix: hamming distance matrix of the chunk, the shape of which is (query number, chunk size).
+    :type matrix: numpy.ndarray
+
+    :param offset: index of the first sample of the chunk.
+    :type offset: int
+
+    :param k: number of nearest samples.
+    :type k: int
+
+    :return: merged indices and hamming distances, sorted by distance (then by index).
+    :rtype: numpy.ndarray, numpy.ndarray
+    """
+    # the unique key prefers the smaller position for the ties of partial selection.
+    keys = matrix * matrix.shape[1] + arange(matrix.shape[1])
+    if matrix.shape[1] > k:
+        positions = argpartition(keys, k - 1, axis=1)[:, :k]
+    else:
+        positions = broadcast_to(arange(matrix.shape[1]), matrix.shape)
+
+    indices = concatenate((indices, positions + offset), axis=1)
+    distances = concatenate((distances, take_along_axis(matrix, positions, axis=1)), axis=1)
+
+    order = lexsort((indices, distances), axis=1)[:, :k]  # sort by distance, then by index.
+
+    return take_along_axis(indices, order, axis=1), take_along_axis(distances, order, axis=1)
+
+
+def select_smallest(distances, k):
+    """
+    Select the positions of the k smallest distances, the smaller positions are preferred for the ties.
+
+    :param distances: one-dimensional distance array.
+    :type distances: numpy.ndarray
+
+    :param k: number of selected positions.
+    :type k: int
+
+    :return: selected positions (unordered).
+    :rtype: numpy.ndarray
+
+    Example
+        >>> from numpy import array
+        >>> from calculator import select_smallest
+        >>> select_smallest(array([3, 1, 2, 1, 1]), k=2)
+        array([1, 3])
+    """
+    if len(distances) <= k:
+        return arange(len(distances))
+
+    kth = partition(distances, k - 1)[k - 1]
+    smaller = flatnonzero(distances < kth)
+    ties = flatnonzero(distances == kth)[:k - len(smaller)]
+
+    return concatenate((smaller, ties))
+
+
+def iterate_chunks(sample_group, chunk_size):
+    """
+    Iterate the sample group with chunks of rows.
+
+    :param sample_group: two-dimensional variable array (including numpy.memmap), path of '.npy' file,
+                         nested list of variables, list of sequences (strings or bytes),
+                         or iterable of two-dimensional row chunks.
+    :type sample_group: numpy.ndarray or str or pathlib.Path or list or iterable
+
+    :param chunk_size: maximum number of samples in each chunk.
+    :type chunk_size: int
+
+    :return: generator of two-dimensional row chunks.
+    :rtype: generator
+
+    Example
+        >>> from numpy import zeros
+        >>> from calculator import iterate_chunks
+        >>> [chunk.shape for chunk in iterate_chunks(zeros(shape=(5, 3)), chunk_size=2)]
+        [(2, 3), (2, 3), (1, 3)]
+
+    .. note::
+        The string (or pathlib.Path) is always treated as the path of sample group (with any suffix),
+        because one sequence cannot be a sample group. The sequences should be provided as a list.
+        The list (or tuple) is treated as the row chunks only if its items are two-dimensional arrays,
+        otherwise it is converted into the sample group, such as the nested list of variables.
+    """
+    if isinstance(sample_group, (str, PurePath)):
+        sample_group = load(sample_group, mmap_mode="r")
+    elif isinstance(sample_group, (list, tuple)) and len(sample_group) > 0:
+        first = sample_group[0]
+        if not isinstance(first, ndarray) or first.ndim < 2:
+            sample_group = as_samples(sample_group)  # the sequences or rows, instead of the chunks.
+
+    if isinstance(sample_group, ndarray):
+        sample_group = [sample_group]
+
+    for chunk in sample_group:
+        chunk = as_samples(chunk)
+        for start, stop in block_ranges(len(chunk), chunk_size):
+            yield asarray(chunk[start: stop])
+
+
+def hamming_tile(former, latter, threshold, engine, out=None, dtype=None, buffers=None, max_distance=None, masks=None,
+                 weights=None):
+    """
+    Calculate the hamming distances between each sample in one tile and each sample in the other tile.
+
+    :param former: two-dimensional sample array (or packed array), the shape of which could be (row number, width).
+    :type former: numpy.ndarray
+
+    :param latter: two-dimensional sample array (or packed array), the shape of which could be (column number, width).
+    :type latter: numpy.ndarray
+
+    :param threshold: threshold for real number system.
+    :type threshold: float or None
+
+    :param engine: calculation engine, "dense", "packed" or "sliced".
+    :type engine: str
+
+    :param out: output array, the shape of which is (row number, column number).
+    :type out: numpy.ndarray or None
+
+    :param dtype: type of hamming distances (default is int), used if 'out' is None.
+    :type dtype: type or None
+
+    :param buffers: reusable temporary tensors of the previous tiles, or None for new tensors.
+    :type buffers: dict or None
+
+    :param max_distance: maximum hamming distance of interest, the larger distances are outputted as 'max_distance' + 1.
+    :type max_distance: int or None
+
+    :param masks: encoded validity masks of former and latter samples (each of them could be None), or None.
+    :type masks: tuple or None
+
+    :param weights: non-negative weight of each variable, or None.
+    :type weights: numpy.ndarray or None
+
+    :return: hamming distance tile, the shape of which is (row number, column number).
+    :rtype: numpy.ndarray
+    """
+    if out is not None:
+        dtype = out.dtype
+    elif dtype is None:
+        dtype = int
+
+    former_mask, latter_mask = (None, None) if masks is None else masks
+
+    def compare(start, stop, rows=None, columns=None, block_out=None):
+        # the operands of the variable block are crossed for the whole tile, or aligned for the remaining pairs.
+        operands = []
+        for values, indices, axis in [(former, rows, 1), (latter, columns, 0), (former_mask, rows, 1),
+                                      (latter_mask, columns, 0)]:
+            if values is not None:
+                values = values[..., start: stop]
+                values = expand_dims(values, axis) if indices is None else values[indices]
+            operands.append(values)
+
+        return compare_samples(operands[0], operands[1], threshold, engine, block_out, dtype, buffers,
+                               masks=[mask for mask in operands[2:] if mask is not None],
+                               weights=None if weights is None else weights[start: stop])
+
+    # each block covers 256 variables, i.e. 256 elements or 4 packed 64-bit words.
+    step = 256 if engine == "dense" else 4
+
+    if max_distance is None or former.shape[-1] <= step:
+        tile = compare(0, former.shape[-1], block_out=out)
+    else:
+        ranges = block_ranges(former.shape[-1], step)
+        tile = compare(*ranges[0], block_out=out)
+        rows, columns = (tile <= max_distance).nonzero()
+        for start, stop in ranges[1:]:
+            if len(rows) == 0:
+                break  # all the pairs are beyond the maximum distance.
+
+            # only the remaining pairs are calculated in the next block of variables.
+            tile[rows, columns] += compare(start, stop, rows, columns)
+            remained = tile[rows, columns] <= max_distance
+            rows, columns = rows[remained], columns[remained]
+
+    if max_distance is not None:
+        tile[tile > max_distance] = max_distance + 1
+
+    return tile
+
+
+def compare_samples(former, latter, threshold, engine, out=None, dtype=int, buffers=None, masks=(), weights=None):
+    """
+    Calculate the hamming distances between the broadcast samples (or packed arrays).
+
+    :param former: sample array (or packed array), the variables (or words) are placed in the last axis.
+    :type former: numpy.ndarray
+
+    :param latter: sample array (or packed array), which can be broadcast with the former one.
+    :type latter: numpy.ndarray
+
+    :param threshold: threshold for real number system.
+    :type threshold: float or None
+
+    :param engine: calculation engine, "dense", "packed" or "sliced".
+    :type engine: str
+
+    :param out: output array, the shape of which is the broadcast shape without the variable axis (and plane axis).
+    :type out: numpy.ndarray or None
+
+    :param dtype: type of hamming distances.
+    :type dtype: type
+
+    :param buffers: reusable temporary tensors, or None for new tensors.
+    :type buffers: dict or None
+
+    :param masks: encoded validity masks, which can be broadcast with the samples (or the merged planes).
+    :type masks: list or tuple
+
+    :param weights: non-negative weight of each variable (only for the "dense" engine), or None.
+    :type weights: numpy.ndarray or None
+
+    :return: hamming distances.
+    :rtype: numpy.ndarray
+
+    Example
+        >>> from numpy import array
+        >>> from calculator import compare_samples
+        >>> compare_samples(array([[0, 1, 0], [1, 1, 1]]), array([[1, 1, 0], [1, 1, 1]]), None, "dense")
+        array([1, 0])
+
+    .. note::
+        For real number system, the difference is calculated in the type of inputs (such as float32) in place,
+        so that only one difference tensor and one bool tensor are used.
+    """
+    shape = broadcast_shapes(former.shape, latter.shape)
+    record = current_record()
+    moment = measure(record)
+
+    if engine == "packed":
+        # xor between 64-bit words, each word covers 64 variables.
+        words = scratch(buffers, "words", shape, uint64)
+        bitwise_xor(former, latter, out=words)
+        moment = measure(record, "compare", moment)
+        if len(masks) > 0:
+            for mask in masks:
+                bitwise_and(words, mask, out=words)  # the variable is counted only if it is valid in both samples.
+            moment = measure(record, "mask", moment)
+        distances = popcount(words, out=out, dtype=dtype)
+        measure(record, "reduce", moment)
+        return distances
+
+    if engine == "sliced":
+        # xor between the planes, and the variable is different if any of its bits is different.
+        words = scratch(buffers, "words", shape, uint64)
+        bitwise_xor(former, latter, out=words)
+        merged = scratch(buffers, "merged", shape[:-2] + shape[-1:], uint64)
+        bitwise_or.reduce(words, axis=-2, out=merged)
+        moment = measure(record, "compare", moment)
+        if len(masks) > 0:
+            for mask in masks:
+                bitwise_and(merged, mask, out=merged)
+            moment = measure(record, "mask", moment)
+        distances = popcount(merged, out=out, dtype=dtype)
+        measure(record, "reduce", moment)
+        return distances
+
+    flags = scratch(buffers, "flags", shape, bool)
+
+    if threshold is None:
+        # compare directly to illustrate the difference flag with the bool tensor.
+        not_equal(former, latter, out=flags)
+        moment = measure(record, "compare", moment)
+    else:
+        # the unsigned (or bool) difference would overflow, so the signed type is used.
+        difference_type = result_type(former, latter)
+        if difference_type.kind in "bu":
+            difference_type = result_type(difference_type, int8)
+
+        # do subtraction to define the actual difference between any two samples in the same position.
+        difference = scratch(buffers, "difference", shape, difference_type)
+        subtract(former, latter, out=difference, dtype=difference_type)
+        absolute(difference, out=difference)
+        moment = measure(record, "compare", moment)
+        greater(difference, threshold, out=flags)
+        moment = measure(record, "threshold", moment)
+
+    if len(masks) > 0:
+        for mask in masks:
+            logical_and(flags, mask, out=flags)  # any non-zero value of the mask is valid, without a bool copy.
+        moment = measure(record, "mask", moment)
+
+    if weights is None:
+        distances = sum(flags, axis=-1, dtype=dtype, out=out)  # calculate hamming distances.
+    else:
+        weighted = scratch(buffers, "weighted", shape, weights.dtype)
+        multiply(flags, weights, out=weighted)
+        distances = sum(weighted, axis=-1, dtype=dtype, out=out)  # calculate weighted hamming distances.
+    measure(record, "reduce", moment)
+
+    return distances
+
+
+def scratch(buffers, name, shape, dtype):
+    """
+    Get the temporary tensor from the reusable buffers.
+
+    :param buffers: reusable temporary tensors, or None for a new tensor.
+    :type buffers: dict or None
+
+    :param name: name of the temporary tensor.
+    :type name: str
+
+    :param shape: shape of the temporary tensor.
+    :type shape: tuple
+
+    :param dtype: type of the temporary tensor.
+    :type dtype: type
+
+    :return: temporary tensor, the values of which are undefined.
+    :rtype: numpy.ndarray
+    """
+    record = current_record()
+
+    if buffers is None:
+        values = empty(shape=shape, dtype=dtype)
+        if record is not None:
+            record.allocate(values)
+        return values
+
+    size = int(prod(shape))
+    key = (name, dtype_of(dtype))
+    # the buffer is only enlarged, so the smaller last tiles reuse the buffer of the previous tiles.
+    if key not in buffers or buffers[key].size < size:
+        buffers[key] = empty(shape=(size,), dtype=dtype)
+        if record is not None:
+            record.allocate(buffers[key])
+
+    return buffers[key][:size].reshape(shape)
+
+
+def choose_block_size(width, memory_limit):
+    """
+    Choose the side length of square tiles, so that the cross tensor of one tile fits in the memory limit.
+
+    :param width: number of elements (variables or packed words) in each sample.
+    :type width: int
+
+    :param memory_limit: approximate memory budget (bytes) of one tile.
+    :type memory_limit: int
+
+    :return: number of samples in each side of the tile.
+    :rtype: int
+
+    Example
+        >>> from calculator import choose_block_size
+        >>> choose_block_size(width=20, memory_limit=2 ** 20)
+        76
+    """
+    # each element of the cross tensor takes at most 8 bytes for difference and 1 byte for flag.
+    return max(1, int(sqrt(memory_limit / (max(width, 1) * 9))))
+
+
+def check_variables(*arrays):
+    """
+    Check that the arrays have the same variable number (the last axis).
+
+    :param arrays: sample arrays.
+    :type arrays: numpy.ndarray
+
+    Example
+        >>> from numpy import array
+        >>> from calculator import check_variables
+        >>> check_variables(array([0, 1, 0]), array([[1, 1], [0, 1]]))
+        Traceback (most recent call last):
+        ...
+        ValueError: the variable numbers of samples should be equal, but got 3 and 2.
+
+    .. note::
+        The engines compare the variables block by block (and the packed ones pad the words),
+        so the different variable numbers would be silently cut or padded instead of failing the broadcast.
+    """
+    numbers = [values.shape[-1] for values in arrays]
+    if len(set(numbers)) > 1:
+        raise ValueError("the variable numbers of samples should be equal, but got "
+                         + " and ".join([str(number) for number in numbers]) + ".")
+
+
+def prepare_samples(samples, other_samples, threshold, engine, weighted=False):
+    """
+    Select the calculation engine and encode the two sample groups of hamming matrix.
+
+    :param samples: two-dimensional sample array, the shape of which could be (sample number, variable number).
+    :type samples: numpy.ndarray
+
+    :param other_samples: another two-dimensional sample array with above-mentioned shape, or None.
+    :type other_samples: numpy.ndarray or None
+
+    :param threshold: threshold for real number system.
+    :type threshold: float or None
+
+    :param engine: requested engine, "dense", "packed", "sliced" or None (choose automatically).
+    :type engine: str or None
+
+    :param weighted: the variables are weighted, which is only supported by the "dense" engine.
+    :type weighted: bool
+
+    :return: chosen engine, encoded samples and encoded other samples (the former one if no other samples).
+    :rtype: str, numpy.ndarray, numpy.ndarray
+    """
+    samples = as_samples(samples)
+    other_samples = None if other_samples is None else as_samples(other_samples)
+    arrays = [samples] if other_samples is None else [samples, other_samples]
+    check_variables(*arrays)
+
+    used_engine = select_engine(engine, threshold, *arrays, weighted=weighted)
+    bits = count_bits(*arrays) if used_engine == "sliced" else None
+
+    former = encode_samples(samples, used_engine, bits)
+    latter = former if other_samples is None else encode_samples(other_samples, used_engine, bits)
+
+    return used_engine, former, latter
+
+
+def digest(*arrays):
+    """
+    Calculate the digest of the arrays (including their shapes and types) without copying the whole arrays.
+
+    :param arrays: input arrays.
+    :type arrays: numpy.ndarray
+
+    :return: hexadecimal SHA-256 digest.
+    :rtype: str
+
+    Example
+        >>> from numpy import array
+        >>> from calculator import digest
+        >>> digest(array([[0, 1]])) == digest(array([[0, 1]])), digest(array([[0, 1]])) == digest(array([[1, 0]]))
+        (True, False)
+    """
+    hasher = sha256()
+    for values in arrays:
+        hasher.update((str(values.dtype) + str(values.shape)).encode("ascii"))
+        # hash the rows block by block (about 16 MB), so that the memory-mapped samples are not loaded at once.
+        row_bytes = max(values.nbytes // max(len(values), 1), 1)
+        for start, stop in block_ranges(len(values), 2 ** 24 // row_bytes):
+            hasher.update(ascontiguousarray(values[start: stop]).data)
+
+    return hasher.hexdigest()
+
+
+def prepare_output(out, shape, dtype, variable_number):
+    """
+    Prepare the output array of hamming distances.
+
+    :param out: preallocated output array, or None for a new array.
+    :type out: numpy.ndarray or None
+
+    :param shape: required shape of output array.
+    :type shape: tuple
+
+    :param dtype: type of new output array (default is int).
+    :type dtype: type or None
+
+    :param variable_number: number of variables, i.e. the maximum hamming distance.
+    :type variable_number: int
+
+    :return: output array.
+    :rtype: numpy.ndarray
+
+    Example
+        >>> from calculator import prepare_output
+        >>> prepare_output(out=None, shape=(2, 3), dtype="uint8", variable_number=100).dtype
+        dtype('uint8')
+    """
+    if out is None:
+        out = zeros(shape=shape, dtype=int if dtype is None else dtype)
+        record = current_record()
+        if record is not None:
+            record.allocate(out)
+    elif out.shape != tuple(shape):
+        raise ValueError("the shape of output array should be " + str(tuple(shape)) + ", "
+                         + "but got " + str(out.shape) + ".")
+
+    if out.dtype.kind in "iu" and iinfo(out.dtype).max < variable_number:
+        raise ValueError("the type " + str(out.dtype) + " cannot hold the hamming distance of "
+                         + str(variable_number) + " variables.")
+
+    return out
+
+
+def prepare_weights(weights, variable_number):
+    """
+    Check the weights of variables.
+
+    :param weights: non-negative weight of each variable, or None for the unweighted distances.
+    :type weights: numpy.ndarray or list or None
+
+    :param variable_number: number of variables.
+    :type variable_number: int
+
+    :return: weight array, or None.
+    :rtype: numpy.ndarray or None
+    """
+    if weights is None:
+        return None
+
+    weights = asarray(weights)
+    if weights.shape != (variable_number,):
+        raise ValueError("the shape of weights should be (" + str(variable_number) + ",), "
+                         + "but got " + str(weights.shape) + ".")
+
+    if weights.size > 0 and weights.min() < 0:
+        raise ValueError("the weights should be non-negative.")
+
+    return weights
+
+
+def prepare_mask(mask, samples):
+    """
+    Check the validity mask of samples.
+
+    :param mask: validity mask (True or 1 refers to the valid variable) with the same shape as the samples, or None.
+    :type mask: numpy.ndarray or None
+
+    :param samples: masked samples.
+    :type samples: numpy.ndarray
+
+    :return: mask array, or None.
+    :rtype: numpy.ndarray or None
+    """
+    if mask is None:
+        return None
+
+    mask = asarray(mask)
+    if mask.shape != samples.shape:
+        raise ValueError("the shape of mask should be " + str(samples.shape) + ", but got " + str(mask.shape) + ".")
+
+    return mask
+
+
+def encode_mask(mask, engine):
+    """
+    Encode the validity mask for the calculation engine.
+
+    :param mask: validity mask, the variables are placed in the last axis.
+    :type mask: numpy.ndarray
+
+    :param engine: calculation engine, "dense", "packed" or "sliced".
+    :type engine: str
+
+    :return: the mask itself for the "dense" engine, or bit-packed mask for the other engines.
+    :rtype: numpy.ndarray
+
+    Example
+        >>> from numpy import array
+        >>> from calculator import encode_mask
+        >>> encode_mask(array([[1, 1, 0], [0, 1, 1]]), "packed").shape
+        (2, 1)
+
+    .. note::
+        Any non-zero value of the mask refers to the valid variable.
+        The "dense" engine applies the mask of any type tile by tile, so the mask is never copied as a whole.
+    """
+    if engine == "dense":
+        return mask
+
+    return pack(mask)
+
+
+def take_rows(values, start, stop):
+    """
+    Take the rows of the array, which could be None.
+
+    :param values: array, or None.
+    :type values: numpy.ndarray or None
+
+    :param start: start row.
+    :type start: int
+
+    :param stop: stop row.
+    :type stop: int
+
+    :return: rows of the array, or None.
+    :rtype: numpy.ndarray or None
+    """
+    return None if values is None else values[start: stop]
+
+
+def compact(values, positions):
+    """
+    Move the kept rows of the array forward in place, without the temporary copy of the kept rows.
+
+    :param values: array to be compacted.
+    :type values: numpy.ndarray
+
+    :param positions: kept row positions, in ascending order.
+    :type positions: numpy.ndarray
+
+    Example
+        >>> from numpy import array
+        >>> from calculator import compact
+        >>> values = array([[0, 1], [2, 3], [4, 5], [6, 7]])
+        >>> compact(values, positions=array([0, 2, 3]))
+        >>> values[:3]
+        array([[0, 1],
+               [4, 5],
+               [6, 7]])
+    """
+    # each run of consecutive kept rows is moved forward by its shift,
+    # in pieces no longer than the shift, so that no piece overlaps its destination.
+    starts = flatnonzero(positions[1:] != positions[:-1] + 1) + 1
+    for first, last in zip([0] + starts.tolist(), starts.tolist() + [len(positions)]):
+        if first == last:
+            continue
+        start, shift = int(positions[first]), int(positions[first]) - first
+        if shift == 0:
+            continue
+        for offset in range(0, last - first, shift):
+            stop = min(offset + shift, last - first)
+            values[first + offset: first + stop] = values[start + offset: start + stop]
+
+
+def block_ranges(total, block_size):
+    """
+    Split the positions into consecutive blocks.
+
+    :param total: number of positions.
+    :type total: int
+
+    :param block_size: number of positions in each block (the last block may be smaller).
+    :type block_size: int
+
+    :return: start and stop positions of blocks.
+    :rtype: list
+
+    Example
+        >>> from calculator import block_ranges
+        >>> block_ranges(total=7, block_size=3)
+        [(0, 3), (3, 6), (6, 7)]
+    """
+    block_size = max(1, block_size)
+    return [(start, min(start + block_size, total)) for start in range(0, total, block_size)]
+
+
+def count_workers(n_jobs):
+    """
+    Count the workers used for the calculation.
+
+    :param n_jobs: number of workers, -1 (or other non-positive number) refers to all the processors.
+    :type n_jobs: int or None
+
+    :return: number of workers.
+    :rtype: int
+    """
+    if n_jobs is None:
+        return 1
+
+    if n_jobs <= 0:
+        return max(1, (cpu_count() or 1) + 1 + n_jobs)
+
+    return n_jobs
+
+
+def execute(task, ranges, workers):
+    """
+    Execute the task for each block, in the current thread or in a thread pool.
+
+    :param task: task function, which receives the start and stop positions of one block.
+    :type task: function
+
+    :param ranges: start and stop positions of blocks.
+    :type ranges: list
+
+    :param workers: number of workers.
+    :type workers: int
+
+    .. note::
+        The calculation of numpy releases the global interpreter lock,
+        so the threads run in parallel and share the inputs and outputs without any copy.
+    """
+    if workers == 1 or len(ranges) <= 1:
+        for start, stop in ranges:
+            task(start, stop)
+    else:
+        record = current_record()
+        if record is not None:
+            task = traced(task, record)
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+            for future in [executor.submit(task, start, stop) for start, stop in ranges]:
+                future.result()
+
+
+def current_record():
+    """
+    Get the record of the profiled call in the current thread.
+
+    :return: record of the profiled call, or None if no profiler is active.
+    :rtype: calculator.CallRecord or None
+    """
+    if not profilers:
+        return None
+
+    return getattr(tracing, "record", None)
+
+
+def measure(record, phase=None, moment=None):
+    """
+    Add the seconds from the moment to now as one phase of the record.
+
+    :param record: record of the profiled call, or None.
+    :type record: calculator.CallRecord or None
+
+    :param phase: name of phase, or None for starting the measurement.
+    :type phase: str or None
+
+    :param moment: start moment of the phase.
+    :type moment: float or None
+
+    :return: current moment, or None if the record is None.
+    :rtype: float or None
+    """
+    if record is None:
+        return None
+
+    now = perf_counter()
+    if phase is not None:
+        record.add(phase, now - moment)
+
+    return now
+
+
+def traced(task, record):
+    """
+    Share the record of the profiled call with the task running in another thread.
+
+    :param task: task function, which receives the start and stop positions of one block.
+    :type task: function
+
+    :param record: record of the profiled call.
+    :type record: calculator.CallRecord
+
+    :return: task function with the record.
+    :rtype: function
+    """
+    def wrapper(start, stop):
+        tracing.record = record
+        try:
+            task(start, stop)
+        finally:
+            tracing.record = None
+
+    return wrapper
+
+
+def select_engine(engine, threshold, *arrays, weighted=False, reused=False):
+    """
+    Select the calculation engine for the given inputs.
+
+    :param engine: requested engine, "dense", "packed", "sliced", "auto" (choose the fastest one through calibration)
+                   or None (choose automatically).
+    :type engine: str or None
+
+    :param threshold: threshold for real number system.
+    :type threshold: float or None
+
+    :param arrays: input arrays of the calculation.
+    :type arrays: numpy.ndarray
+
+    :param weighted: the variables are weighted, which is only supported by the "dense" engine.
+    :type weighted: bool
+
+    :param reused: the encoded inputs are reused by many queries (such as the index), so the encoding is paid once.
+    :type reused: bool
+
+    :return: chosen engine.
+    :rtype: str
+
+    Example
+        >>> from numpy import array
+        >>> from calculator import select_engine
+        >>> select_engine(None, None, array([0, 1, 0]), array([[1, 1, 0], [0, 1, 1]]))
+        'dense'
+        >>> select_engine(None, None, array([[1, 1, 0], [0, 1, 1]]))
+        'packed'
+        >>> select_engine(None, None, array([0, 2, 0]), array([[1, 1, 0], [0, 1, 3]]))
+        'dense'
+        >>> select_engine(None, None, array([[1, 1, 0], [0, 1, 3]]), reused=True)
+        'sliced'
+        >>> select_engine(None, 0.4, array([0.2, 0.5, 0.8]), array([[0.7, 0.1, 0.2], [0.3, 0.4, 0.7]]))
+        'dense'
+        >>> select_engine("packed", None, array([2, 1]), array([[1, 1], [0, 1]]))
+        Traceback (most recent call last):
+        ...
+        ValueError: the "packed" engine only supports the samples containing 0 and 1.
+    """
+    if engine is None:
+        if threshold is not None or weighted:
+            return "dense"
+        # packing or slicing the group costs more than comparing one sample (one-dimensional) against it directly,
+        # so they only pay off for the reused encoding or the matrix, and the values need not be scanned otherwise.
+        if not reused and min(values.ndim for values in arrays) < 2:
+            return "dense"
+        bits = count_bits(*arrays)
+        if bits == 1:
+            return "packed"
+        # the bit planes only pay off for the reused encoding or the matrix of wide samples.
+        if bits is not None and bits <= 4 and (reused or arrays[0].shape[-1] >= 256):
+            return "sliced"
+        return "dense"
+
+    if engine == "auto":
+        bits = count_bits(*arrays) if threshold is None and not weighted else None
+        # only the engines supporting the inputs are compared.
+        candidates = ["dense"]
+        if bits == 1:
+            candidates.append("packed")
+        if bits is not None and bits <= 4:
+            candidates.append("sliced-" + str(bits))
+        engines = calibrate()["engines"]
+        return min(candidates, key=lambda name: estimate_seconds(engines[name], arrays, reused)).split("-")[0]
+
+    if engine not in ("dense", "packed", "sliced"):
+        raise ValueError("engine should be \"dense\", \"packed\", \"sliced\" or \"auto\", "
+                         + "but got " + str(engine) + ".")
+
+    if engine != "dense" and threshold is not None:
+        raise ValueError("the \"" + engine + "\" engine does not support the real number system with threshold.")
+
+    if engine != "dense" and weighted:
+        raise ValueError("the \"" + engine + "\" engine does not support the weights.")
+
+    # the empty arrays contain no value, so they are supported by any engine.
+    if engine == "packed" and count_bits(*[values for values in arrays if values.size > 0]) != 1:
+        raise ValueError("the \"packed\" engine only supports the samples containing 0 and 1.")
+
+    return engine
+
+
+def calibrate(path=None, force=False):
+    """
+    Calibrate the engines on this machine, the results are cached on disk and reused by the later processes.
+
+    :param path: path of the cached calibration, or None for 'calibration.json' in the cache folder
+                 ('$XDG_CACHE_HOME/faster_hamming' or '~/.cache/faster_hamming').
+    :type path: str or None
+
+    :param force: calibrate again even if the cached calibration of this machine exists.
+    :type force: bool
+
+    :return: calibration, including the machine information,
+             and the costs of encoding, group and matrix comparison, and the fastest tile budget (bytes) of each engine.
+    :rtype: dict
+
+    .. note::
+        Each engine ("dense", "packed", and "sliced" with 1 ~ 4 bit planes) is measured on the 8-bit and 64-bit inputs
+        of 128 and 1024 variables, including the encoding of 2048 samples, the comparison of one sample against them,
+        and a 256 x 256 tiled matrix with different tile budgets, which takes a few seconds once per machine.
+        The encoding is recorded as the seconds per variable, and the comparisons are recorded as the fixed seconds
+        and the seconds per variable of each sample pair, see 'estimate_seconds'.
+        The cached calibration is discarded if the machine information (such as numpy version) is changed,
+        or it is made by an older version of the cost model.
+    """
+    if path is None:
+        path = join(environ.get("XDG_CACHE_HOME", join(expanduser("~"), ".cache")), "faster_hamming",
+                    "calibration.json")
+
+    machine = {"platform": platform(), "processor": processor(), "cpu_count": cpu_count(), "numpy": numpy_version}
+    version = 2
+
+    if not force:
+        if path in calibrations and calibrations[path]["machine"] == machine:
+            return calibrations[path]
+
+        if exists(path):
+            with open(path, "r") as file:
+                calibration = load_json(file)
+            if calibration.get("machine") == machine and calibration.get("version") == version:
+                calibrations[path] = calibration
+                return calibration
+
+    def fastest(function, *arguments):
+        seconds = []
+        for _ in range(2):
+            moment = perf_counter()
+            function(*arguments)
+            seconds.append(perf_counter() - moment)
+        return min(seconds)
+
+    generator = default_rng(2022)
+    engines = {}
+    for name, engine, bits in [("dense", "dense", 4), ("packed", "packed", 1)] \
+            + [("sliced-" + str(bits), "sliced", bits) for bits in range(1, 5)]:
+        costs = {"encode": {}, "group": {}, "matrix": {}, "memory_limit": {}}
+        for values_type in [uint8, int64]:
+            key = str(dtype_of(values_type).itemsize)
+            timings = {"group": [], "matrix": []}
+            for width in [128, 1024]:
+                samples = generator.integers(0, 2 ** bits, size=(2048, width)).astype(values_type)
+
+                seconds = fastest(encode_samples, samples, engine, bits)
+                costs["encode"][key] = seconds / samples.size
+
+                codes = encode_samples(samples, engine, bits)
+                sample, distances = expand_dims(codes[0], axis=0), zeros(shape=(1, len(codes)), dtype=int)
+                timings["group"].append(fastest(hamming_tile, sample, codes, None, engine, distances) / len(codes))
+
+                former, latter = codes[:256], codes[256: 512]
+                matrix = zeros(shape=(256, 256), dtype=int)
+                options = []
+                for memory_limit in [2 ** 18, 2 ** 20, 2 ** 22, 2 ** 24]:
+                    block_size = choose_block_size(int(prod(former.shape[1:])), memory_limit)
+                    seconds = fastest(tiled_matrix, former, latter, None, engine, block_size, 1, matrix)
+                    options.append((seconds, memory_limit))
+                seconds, costs["memory_limit"][key] = min(options)
+                timings["matrix"].append(seconds / (256 * 256))
+
+            # the seconds per pair are fitted linearly by the variable number, i.e. the fixed and variable parts,
+            # because the packed engines pay a large fixed cost for each pair of the narrow samples.
+            for case, (narrow, wide) in timings.items():
+                slope = max(wide - narrow, 0) / (1024 - 128)
+                costs[case][key] = [max(narrow - slope * 128, 0), slope]
+        engines[name] = costs
+
+    calibration = {"machine": machine, "version": version, "engines": engines}
+
+    makedirs(dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as file:
+        dump(calibration, file, indent=2)
+    replace(path + ".tmp", path)  # the other processes never read a partial calibration.
+
+    calibrations[path] = calibration
+
+    return calibration
+
+
+def estimate_seconds(costs, arrays, reused=False):
+    """
+    Estimate the seconds of one calculation through the calibrated costs of an engine, used by the "auto" engine.
+
+    :param costs: calibrated costs of the engine, see 'calibrate'.
+    :type costs: dict
+
+    :param arrays: input arrays, i.e. one sample (one-dimensional) and the sample group, or the samples of the matrix.
+    :type arrays: list
+
+    :param reused: the encoded inputs are reused by many queries (such as the index), so the encoding is paid once.
+    :type reused: bool
+
+    :return: estimated seconds.
+    :rtype: float
+
+    Example
+        >>> from numpy import zeros
+        >>> from calculator import estimate_seconds
+        >>> costs = {"encode": {"8": 1e-9}, "group": {"8": [1e-8, 1e-10]}, "matrix": {"8": [1e-9, 1e-11]}}
+        >>> round(estimate_seconds(costs, [zeros(shape=(100,)), zeros(shape=(1000, 100))]), 7)
+        0.0001201
+        >>> round(estimate_seconds(costs, [zeros(shape=(1000, 100)), zeros(shape=(1000, 100))]), 7)
+        0.0022
+    """
+    key = size_key(*arrays)
+    sizes = [len(values) if values.ndim > 1 else 1 for values in arrays]
+    width = arrays[-1].shape[-1]
+
+    if arrays[0].ndim == 1 or reused:
+        # each query (or the observed sample) is compared with the sample group once.
+        pairs, case = sizes[-1], "group"
+    else:
+        # only the upper triangle is calculated for the distances within the samples.
+        pairs, case = sizes[0] * sizes[-1] if len(arrays) > 1 else sizes[0] * (sizes[0] + 1) // 2, "matrix"
+    encoded = 0 if reused else int(sum(sizes))
+
+    fixed, variable = costs[case][key]
+
+    return costs["encode"][key] * encoded * width + (fixed + variable * width) * pairs
+
+
+def size_key(*arrays):
+    """
+    Get the key of the calibrated costs for the item size of the arrays.
+
+    :param arrays: input or encoded arrays.
+    :type arrays: numpy.ndarray
+
+    :return: "1" if all arrays are 8-bit, otherwise "8".
+    :rtype: str
+    """
+    return "1" if all(values.itemsize == 1 for values in arrays) else "8"
+
+
+def tune_memory_limit(engine, former, memory_limit, workers):
+    """
+    Tune the tile budget through the calibration and the available memory, used by the "auto" engine.
+
+    :param engine: chosen engine, "dense", "packed" or "sliced".
+    :type engine: str
+
+    :param former: encoded sample array.
+    :type former: numpy.ndarray
+
+    :param memory_limit: maximum memory budget (bytes) of one tile.
+    :type memory_limit: int
+
+    :param workers: number of workers, each of which holds one tile.
+    :type workers: int
+
+    :return: tuned memory budget (bytes) of one tile.
+    :rtype: int
+    """
+    name = engine + "-" + str(former.shape[-2]) if engine == "sliced" else engine
+    memory_limit = min(memory_limit, calibrate()["engines"][name]["memory_limit"][size_key(former)])
+
+    available = available_memory()
+    if available is not None:
+        # keep half of the available memory for the output and the other processes.
+        memory_limit = min(memory_limit, available // (2 * workers))
+
+    return max(memory_limit, 1)
+
+
+def available_memory():
+    """
+    Get the available physical memory.
+
+    :return: available bytes, or None if it is unknown on this platform.
+    :rtype: int or None
+    """
+    if sysconf is None:
+        return None
+
+    try:
+        return sysconf("SC_AVPHYS_PAGES") * sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError):
+        return None
+
+
+def is_binary(values):
+    """
+    Check whether the array only contains 0 and 1.
+
+    :param values: variable array.
+    :type values: numpy.ndarray
+
+    :return: checked result.
+    :rtype: bool
+    """
+    return count_bits(values) == 1
+
+
+def count_bits(*arrays):
+    """
+    Count the bits required by the non-negative integers in the arrays.
+
+    :param arrays: variable arrays.
+    :type arrays: numpy.ndarray
+
+    :return: number of bits (at least 1), or None if any array is empty or contains other values.
+    :rtype: int or None
+
+    Example
+        >>> from numpy import array
+        >>> from calculator import count_bits
+        >>> count_bits(array([0, 1, 0]), array([[1, 1, 0], [0, 1, 3]]))
+        2
+        >>> count_bits(array([0, -1, 0])) is None
+        True
+    """
+    bits = 1
+    for values in arrays:
+        if values.size == 0 or values.dtype.kind not in "biu":
+            return None
+
+        if values.dtype.kind != "b":
+            if values.min() < 0:
+                return None
+            bits = max(bits, int(values.max()).bit_length())
+
+    return bits
+
+
+def encode_samples(samples, engine, bits):
+    """
+    Encode the samples for the calculation engine.
+
+    :param samples: one-dimensional or two-dimensional variable array, the variables are placed in the last axis.
+    :type samples: numpy.ndarray
+
+    :param engine: calculation engine, "dense", "packed" or "sliced".
+    :type engine: str
+
+    :param bits: number of bits of the integers, used by the "sliced" engine.
+    :type bits: int or None
+
+    :return: encoded samples.
+    :rtype: numpy.ndarray
+    """
+    if engine == "dense":
+        return samples
+
+    record = current_record()
+    moment = measure(record)
+
+    codes = pack(samples) if engine == "packed" else slice_planes(samples, bits)
+
+    measure(record, "encode", moment)
+
+    return codes
+
+
+def encode_sequences(sequences, alphabet=None):
+    """
+    Encode the sequences (such as DNA or protein) into the arrays of symbol codes.
+
+    :param sequences: one sequence or the sequences with the same length, each sequence is a string or bytes.
+    :type sequences: str or bytes or list
+
+    :param alphabet: symbols of sequences, which are encoded as 0, 1, 2, ... in order.
+                     If None, the symbols are encoded as their ASCII (byte) values.
+    :type alphabet: str or bytes or None
+
+    :return: one-dimensional code array for one sequence,
+             or two-dimensional code array with the shape of (sequence number, sequence length).
+    :rtype: numpy.ndarray
+
+    Example
+        >>> from calculator import encode_sequences
+        >>> encode_sequences(["ACGT", "AGGT"], alphabet="ACGT")
+        array([[0, 1, 2, 3],
+               [0, 2, 2, 3]], dtype=uint8)
+        >>> encode_sequences("AC")
+        array([65, 67], dtype=uint8)
+
+    .. note::
+        The codes are unsigned 8-bit integers, so the distances are calculated through the byte-wise comparison.
+        For the small alphabet (at most 16 symbols), the codes of the index or the wide matrix are calculated
+        by the "sliced" engine.
+    """
+    if isinstance(sequences, (str, bytes)):
+        return encode_sequences([sequences], alphabet)[0]
+
+    data = [sequence.encode("ascii") if isinstance(sequence, str) else bytes(sequence) for sequence in sequences]
+    if len(set([len(sequence) for sequence in data])) > 1:
+        raise ValueError("the sequences should have the same length.")
+
+    codes = frombuffer(b"".join(data), dtype=uint8).reshape(len(data), len(data[0]) if len(data) > 0 else 0)
+
+    if alphabet is not None:
+        symbols = frombuffer(alphabet.encode("ascii") if isinstance(alphabet, str) else bytes(alphabet), dtype=uint8)
+        table = full(shape=(256,), fill_value=len(symbols), dtype=int)
+        table[symbols] = arange(len(symbols))
+        codes = table[codes]
+        if codes.size > 0 and codes.max() == len(symbols):
+            raise ValueError("the sequences contain the symbols out of the alphabet.")
+        codes = codes.astype(uint8)
+
+    return codes
+
+
+def as_samples(values):
+    """
+    Convert the strings (or bytes) and the nested lists into the sample array.
+
+    :param values: sample array, nested list of variables, sequence, or list of sequences.
+    :type values: numpy.ndarray or str or bytes or list
+
+    :return: sample array (the array, including numpy.memmap, is not copied).
+    :rtype: numpy.ndarray
+
+    Example
+        >>> from calculator import as_samples
+        >>> as_samples([[0, 1], [1, 1]])
+        array([[0, 1],
+               [1, 1]])
+    """
+    if isinstance(values, (str, bytes)):
+        return encode_sequences(values)
+
+    if isinstance(values, (list, tuple)) and len(values) > 0 and isinstance(values[0], (str, bytes)):
+        return encode_sequences(values)
+
+    return values if isinstance(values, ndarray) else asarray(values)
+
+
+def pack(samples):
+    """
+    Pack the binary variables of each sample into 64-bit words.
+
+    :param samples: one-dimensional or two-dimensional binary array, the variables are placed in the last axis.
+    :type samples: numpy.ndarray
+
+    :return: packed array, the shape of last axis is (ceil(variable number / 64),).
+    :rtype: numpy.ndarray
+
+    Example
+        >>> from numpy import array
+        >>> from calculator import pack
+        >>> pack(array([[1, 1, 0], [0, 1, 1]])).shape
+        (2, 1)
+    """
+    packed = packbits(samples, axis=-1)
+
+    # pad the bytes to the multiple of 8 so that they can be viewed as 64-bit words.
+    remainder = (-packed.shape[-1]) % 8
+    if remainder > 0:
+        packed = pad(packed, [(0, 0)] * (packed.ndim - 1) + [(0, remainder)])
+
+    return ascontiguousarray(packed).view(uint64)
+
+
+def slice_planes(samples, bits):
+    """
+    Slice the small non-negative integers into bit planes, and pack each plane into 64-bit words.
+
+    :param samples: one-dimensional or two-dimensional integer array, the variables are placed in the last axis.
+    :type samples: numpy.ndarray
+
+    :param bits: number of bit planes.
+    :type bits: int
+
+    :return: packed planes, the shape of last two axes is (bits, ceil(variable number / 64)).
+    :rtype: numpy.ndarray
+
+    Example
+        >>> from numpy import array
+        >>> from calculator import slice_planes
+        >>> slice_planes(array([[0, 1, 2], [3, 2, 1]]), bits=2).shape
+        (2, 2, 1)
+    """
+    if samples.dtype == bool:
+        samples = samples.view(uint8)
+
+    return stack([pack((samples >> plane) & 1) for plane in range(bits)], axis=-2)
+
+
+def popcount(words, out=None, dtype=int):
+    """
+    Count the set bits of the 64-bit words along the last axis.
+
+    :param words: packed array with 64-bit words.
+    :type words: numpy.ndarray
+
+    :param out: output array, the shape of which is that of words without the last axis.
+    :type out: numpy.ndarray or None
+
+    :param dtype: type of counts.
+    :type dtype: type
+
+    :return: number of set bits.
+    :rtype: numpy.ndarray
+    """
+    if bitwise_count is not None:
+        return sum(bitwise_count(words), axis=-1, dtype=dtype, out=out)
+
+    # look up the set bits of each byte when the population count of numpy is unavailable.
+    return sum(bit_counts[ascontiguousarray(words).view(uint8)], axis=-1, dtype=dtype, out=out)
@@ -1,156 +1,264 @@
-from matplotlib import pyplot, patches
-from numpy import array, random, sum, min, max, median, log10
-from time import process_time
+from argparse import ArgumentParser
+from csv import DictWriter
+from datetime import datetime
+from json import dump
+from numpy import random, sum, median, __version__ as numpy_version
+from os import cpu_count
+from platform import platform, processor, python_version
+from time import perf_counter, process_time
+from tracemalloc import start as start_tracing, stop as stop_tracing, get_traced_memory, reset_peak
 
-from calculator import hamming_group, hamming_matrix
+from calculator import hamming_group, hamming_matrix, available_memory
 
 
-used_colors = [["#FE817D", "#FCBBAE"], ["#81B8DF", "#B1CCDF"]]
-labels = ["customized", "numpy.sum"]
-bias = [-0.25, 0.25]
+# (name, threshold) of the generated variables, the small and other integer variables belong to 0 ~ 3 and 0 ~ 49.
+data_kinds = [("bool", None), ("small", None), ("int", None), ("float", 0.5)]
 
 
-# noinspection PyTypeChecker
-def calculate_1(random_seed, sample_numbers, variable_number, repeats):
-    random.seed(random_seed)
-    results = []
+def generate(random_seed, kind, shape):
+    """
+    Generate the reproducible samples.
 
-    for sample_number in sample_numbers:
-        our_record, sum_record = [], []
-        for repeat in range(repeats):
-            sample = random.randint(0, 2, size=(variable_number,))
-            sample_group = random.randint(0, 2, size=(int(sample_number), variable_number))
-
-            start = process_time()
-            hamming_group(observed_sample=sample, sample_group=sample_group, threshold=None)
-            our_record.append(process_time() - start)
-
-            start = process_time()
-            for position in range(len(sample_group)):
-                sum(sample != sample_group[position])
-            sum_record.append(process_time() - start)
-
-        results.append([our_record, sum_record])
-
-    results = array(results)
-
-    pyplot.figure(figsize=(10, 5), tight_layout=True)
-    for data_index in range(4):
-        for bias_index in range(2):
-            used_data = results[data_index, bias_index]
-            if min(used_data) > 1e-10:
-                used_data = log10(used_data)
-                if max(used_data) - min(used_data) < 0.02:
-                    result = median(used_data)
-                    pyplot.hlines(result, data_index + bias[bias_index] - 0.08, data_index + bias[bias_index] + 0.08,
-                                  linewidths=1, edgecolors=used_colors[bias_index][0], zorder=3)
-                    pyplot.scatter([data_index + bias[bias_index]], result,
-                                   color="white", edgecolor=used_colors[bias_index][0], linewidth=1, s=20, zorder=4)
-                else:
-                    violin = pyplot.violinplot(dataset=used_data, positions=[data_index + bias[bias_index]],
-                                               bw_method=0.5, showextrema=False, widths=0.3)
-                    for patch in violin["bodies"]:
-                        patch.set_edgecolor(used_colors[bias_index][0])
-                        patch.set_facecolor(used_colors[bias_index][1])
-                        patch.set_linewidth(1)
-                        patch.set_alpha(1)
-                    pyplot.scatter([data_index + bias[bias_index]], median(used_data),
-                                   color="white", edgecolor=used_colors[bias_index][0], linewidth=1, s=40, zorder=4)
-            else:
-                pyplot.scatter([data_index + bias[bias_index]], [-2],
-                               color=used_colors[bias_index][0], marker="x", s=60)
-
-        if data_index % 2 != 0:
-            pyplot.fill_between([data_index - 0.5, data_index + 0.5], [-2.2, -2.2], [3.2, 3.2],
-                                color="#F1F1F1", zorder=0)
-
-    legends = [patches.Patch(facecolor=used_colors[index][1], edgecolor=used_colors[index][0],
-                             linewidth=1, label=labels[index]) for index in range(2)]
-    pyplot.legend(handles=legends, loc="upper left", fontsize=12)
-
-    pyplot.xlabel("different number of samples with 100 variables", fontsize=12)
-    pyplot.xlim(-0.5, 3.5)
-    pyplot.xticks([0, 1, 2, 3], ["$10^4$", "$10^5$", "$10^6$", "$10^7$"], fontsize=12)
-    pyplot.ylabel("seconds spent", fontsize=12)
-    pyplot.ylim(-2.2, 3.2)
-    pyplot.yticks([-2, -1, 0, 1, 2, 3],
-                  ["$10^{-2}$", "$10^{-1}$", "$10^0$", "$10^1$", "$10^2$", "$10^3$"], fontsize=12)
-
-    pyplot.savefig("result.1.svg", format="svg", bbox_inches="tight", dpi=600)
-    pyplot.close()
-
-
-# noinspection PyTypeChecker
-def calculate_2(random_seed, sample_numbers, variable_number, repeats):
-    random.seed(random_seed)
-    results = []
-    for sample_number in sample_numbers:
-        our_record, sum_record = [], []
-        for repeat in range(repeats):
-            print(sample_number, repeat + 1, repeats)
-
-            samples = random.randint(0, 2, size=(int(sample_number), variable_number))
-
-            start = process_time()
-            hamming_matrix(samples=samples, threshold=None)
-            our_record.append(process_time() - start)
-
-            start = process_time()
-            for position_1 in range(len(samples) - 1):
-                for position_2 in range(position_1 + 1, len(samples)):
-                    sum(samples[position_1] != samples[position_2])
-            sum_record.append(process_time() - start)
-
-        results.append([our_record, sum_record])
-
-    results = array(results)
-
-    for data_index in range(4):
-        for bias_index in range(2):
-            used_data = results[data_index, bias_index]
-            if min(used_data) > 1e-10:
-                used_data = log10(used_data)
-                if max(used_data) - min(used_data) < 0.02:
-                    result = median(used_data)
-                    pyplot.hlines(result, data_index + bias[bias_index] - 0.08, data_index + bias[bias_index] + 0.08,
-                                  linewidths=1, edgecolors=used_colors[bias_index][0], zorder=3)
-                    pyplot.scatter([data_index + bias[bias_index]], result,
-                                   color="white", edgecolor=used_colors[bias_index][0], linewidth=1, s=20, zorder=4)
-                else:
-                    violin = pyplot.violinplot(dataset=used_data, positions=[data_index + bias[bias_index]],
-                                               bw_method=0.5, showextrema=False, widths=0.3)
-                    for patch in violin["bodies"]:
-                        patch.set_edgecolor(used_colors[bias_index][0])
-                        patch.set_facecolor(used_colors[bias_index][1])
-                        patch.set_linewidth(1)
-                        patch.set_alpha(1)
-                    pyplot.scatter([data_index + bias[bias_index]], median(used_data),
-                                   color="white", edgecolor=used_colors[bias_index][0], linewidth=1, s=40, zorder=4)
-            else:
-                pyplot.scatter([data_index + bias[bias_index]], [-2],
-                               color=used_colors[bias_index][0], marker="x", s=60)
-
-        if data_index % 2 != 0:
-            pyplot.fill_between([data_index - 0.5, data_index + 0.5], [-2.2, -2.2], [3.2, 3.2],
-                                color="#F1F1F1", zorder=0)
-
-    legends = [patches.Patch(facecolor=used_colors[index][1], edgecolor=used_colors[index][0],
-                             linewidth=1, label=labels[index]) for index in range(2)]
-    pyplot.legend(handles=legends, loc="upper left", fontsize=12)
-
-    pyplot.xlabel("different number of samples with 20 variables", fontsize=12)
-    pyplot.xlim(-0.5, 3.5)
-    pyplot.xticks([0, 1, 2, 3], [r"$500$", r"$1000$", r"$5000$", r"$10000$"], fontsize=12)
-    pyplot.ylabel("seconds spent", fontsize=12)
-    pyplot.ylim(-2.2, 3.2)
-    pyplot.yticks([-2, -1, 0, 1, 2, 3],
-                  ["$10^{-2}$", "$10^{-1}$", "$10^0$", "$10^1$", "$10^2$", "$10^3$"], fontsize=12)
-
-    pyplot.savefig("result.2.svg", format="svg", bbox_inches="tight", dpi=600)
-    pyplot.close()
+    :param random_seed: random seed.
+    :type random_seed: int
+
+    :param kind: name of data kind, "bool", "small", "int" or "float".
+    :type kind: str
+
+    :param shape: shape of samples.
+    :type shape: tuple
+
+    :return: generated samples.
+    :rtype: numpy.ndarray
+    """
+    generator = random.default_rng(random_seed)
+    if kind == "bool":
+        return generator.integers(0, 2, size=shape).astype(bool)
+    elif kind == "small":
+        return generator.integers(0, 4, size=shape)
+    elif kind == "int":
+        return generator.integers(0, 50, size=shape)
+    else:
+        return generator.random(size=shape)
+
+
+def loop_group(observed_sample, sample_group, threshold):
+    """
+    Reference 'numpy.sum' loop of 'hamming_group'.
+    """
+    if threshold is None:
+        return [sum(observed_sample != sample) for sample in sample_group]
+    return [sum(abs(observed_sample - sample) > threshold) for sample in sample_group]
+
+
+def loop_matrix(samples, threshold):
+    """
+    Reference 'numpy.sum' loop of 'hamming_matrix' (upper triangle only).
+    """
+    for position in range(len(samples) - 1):
+        loop_group(samples[position], samples[position + 1:], threshold)
+
+
+def measure(task, warmups, repeats):
+    """
+    Measure the wall time, processor time and peak traced memory of the task.
+
+    :param task: task without parameter.
+    :type task: function
+
+    :param warmups: number of runs before the measurement.
+    :type warmups: int
+
+    :param repeats: number of measured runs.
+    :type repeats: int
+
+    :return: wall times (seconds), processor times (seconds) and peak memory (bytes) of the task.
+    :rtype: list, list, int
+    """
+    for _ in range(warmups):
+        task()
+
+    wall_times, cpu_times = [], []
+    for _ in range(repeats):
+        wall_start, cpu_start = perf_counter(), process_time()
+        task()
+        wall_times.append(perf_counter() - wall_start)
+        cpu_times.append(process_time() - cpu_start)
+
+    # trace the memory in an extra run, so that the tracing overhead is not included in the times.
+    start_tracing()
+    reset_peak()
+    task()
+    peak_memory = get_traced_memory()[1]
+    stop_tracing()
+
+    return wall_times, cpu_times, peak_memory
+
+
+def create_cases(functions, sample_numbers, variable_numbers, kinds, engines, jobs, loop_limit, memory_limit=None):
+    """
+    Create the benchmark cases.
+
+    :param functions: benchmarked functions, "group" or "matrix".
+    :type functions: list
+
+    :param sample_numbers: sample numbers.
+    :type sample_numbers: list
+
+    :param variable_numbers: variable numbers.
+    :type variable_numbers: list
+
+    :param kinds: data kinds, "bool", "small", "int" or "float".
+    :type kinds: list
+
+    :param engines: engines, "dense", "packed", "sliced", "auto" or "loop" (reference 'numpy.sum' loop).
+    :type engines: list
+
+    :param jobs: numbers of threads.
+    :type jobs: list
+
+    :param loop_limit: maximum sample number of the reference loop for each function.
+    :type loop_limit: dict
+
+    :param memory_limit: maximum bytes of the generated samples, or None for no limit.
+    :type memory_limit: int or None
+
+    :return: benchmark cases, each of which is a dictionary of settings.
+    :rtype: list
+    """
+    cases = []
+    for function in functions:
+        for sample_number in sample_numbers:
+            for variable_number in variable_numbers:
+                for kind, threshold in data_kinds:
+                    if kind not in kinds:
+                        continue
+                    # the samples are generated as 64-bit values (and then copied as bool for the bool kind).
+                    sample_bytes = sample_number * variable_number * (9 if kind == "bool" else 8)
+                    if memory_limit is not None and sample_bytes > memory_limit:
+                        print("skip", function, sample_number, variable_number, kind, "(out of memory limit)")
+                        continue
+                    for engine in engines:
+                        if engine == "packed" and kind != "bool":
+                            continue  # the packed engine only supports the binary samples.
+                        if engine == "sliced" and kind not in ("small", "int"):
+                            continue  # the sliced engine targets the non-negative integers (6 planes for 0 ~ 49).
+                        if engine == "loop" and sample_number > loop_limit[function]:
+                            continue  # the reference loop is too slow for the large sample number.
+                        for n_jobs in ([1] if engine == "loop" else jobs):
+                            cases.append({"function": function, "sample_number": sample_number,
+                                          "variable_number": variable_number, "kind": kind, "threshold": threshold,
+                                          "engine": engine, "n_jobs": n_jobs})
+    return cases
+
+
+def run_case(case, random_seed, warmups, repeats):
+    """
+    Run one benchmark case.
+
+    :param case: settings of benchmark case.
+    :type case: dict
+
+    :param random_seed: random seed.
+    :type random_seed: int
+
+    :param warmups: number of runs before the measurement.
+    :type warmups: int
+
+    :param repeats: number of measured runs.
+    :type repeats: int
+
+    :return: benchmark record.
+    :rtype: dict
+    """
+    samples = generate(random_seed, case["kind"], (case["sample_number"], case["variable_number"]))
+    threshold, engine, n_jobs = case["threshold"], case["engine"], case["n_jobs"]
+
+    if case["function"] == "group":
+        pairs = case["sample_number"]
+        if engine == "loop":
+            def task():
+                loop_group(samples[0], samples, threshold)
+        else:
+            def task():
+                hamming_group(samples[0], samples, threshold=threshold, engine=engine, n_jobs=n_jobs)
+    else:
+        pairs = case["sample_number"] * (case["sample_number"] - 1) // 2
+        if engine == "loop":
+            def task():
+                loop_matrix(samples, threshold)
+        else:
+            def task():
+                hamming_matrix(samples, threshold=threshold, engine=engine, n_jobs=n_jobs)
+
+    wall_times, cpu_times, peak_memory = measure(task, warmups, repeats)
+
+    record = dict(case)
+    record.update({"warmups": warmups, "repeats": repeats, "wall_times": wall_times, "cpu_times": cpu_times,
+                   "median_wall_time": float(median(wall_times)), "median_cpu_time": float(median(cpu_times)),
+                   "peak_memory": peak_memory, "pairs_per_second": pairs / max(float(median(wall_times)), 1e-12)})
+    return record
+
+
+def save_records(records, path):
+    """
+    Save the benchmark records with the machine information as JSON, and the summary as CSV.
+
+    :param records: benchmark records.
+    :type records: list
+
+    :param path: path prefix of the outputted files.
+    :type path: str
+    """
+    machine = {"platform": platform(), "processor": processor(), "cpu_count": cpu_count(),
+               "python": python_version(), "numpy": numpy_version, "time": datetime.now().isoformat()}
+
+    with open(path + ".json", "w") as file:
+        dump({"machine": machine, "records": records}, file, indent=2)
+
+    with open(path + ".csv", "w", newline="") as file:
+        fields = [key for key in records[0] if key not in ("wall_times", "cpu_times")] if records else []
+        writer = DictWriter(file, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(records)
 
 
 if __name__ == "__main__":
-    calculate_1(random_seed=2022, sample_numbers=[1e4, 1e5, 1e6, 1e7], variable_number=20, repeats=20)
-    calculate_2(random_seed=2022, sample_numbers=[5e2, 1e3, 5e3, 1e4], variable_number=20, repeats=20)
+    parser = ArgumentParser(description="benchmark of hamming_group and hamming_matrix.")
+    parser.add_argument("--output", default="benchmark", help="path prefix of the JSON and CSV results.")
+    parser.add_argument("--seed", type=int, default=2022, help="random seed of the generated samples.")
+    parser.add_argument("--warmups", type=int, default=1, help="number of runs before the measurement.")
+    parser.add_argument("--repeats", type=int, default=20, help="number of measured runs.")
+    parser.add_argument("--functions", nargs="+", default=["group", "matrix"])
+    parser.add_argument("--group-samples", nargs="+", type=int, default=[10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7])
+    parser.add_argument("--matrix-samples", nargs="+", type=int, default=[500, 1000, 5000, 10000])
+    parser.add_argument("--variables", nargs="+", type=int, default=[20, 100])
+    parser.add_argument("--kinds", nargs="+", default=["bool", "small", "int", "float"])
+    parser.add_argument("--engines", nargs="+", default=["dense", "packed", "sliced", "auto", "loop"])
+    parser.add_argument("--jobs", nargs="+", type=int, default=[1])
+    parser.add_argument("--memory-limit", type=int, default=None,
+                        help="maximum bytes of the generated samples, default is half of the available memory.")
+    parser.add_argument("--quick", action="store_true", help="use the small sizes for a smoke run.")
+    arguments = parser.parse_args()
+
+    if arguments.quick:
+        arguments.group_samples, arguments.matrix_samples = [10 ** 3, 10 ** 4], [100, 200]
+        arguments.variables, arguments.warmups, arguments.repeats = [20], 1, 3
 
+    if arguments.memory_limit is None:
+        # the other half is kept for the calculation, the larger cases are skipped instead of swapping.
+        available = available_memory()
+        arguments.memory_limit = None if available is None else available // 2
+
+    all_cases = []
+    for used_function, used_samples in [("group", arguments.group_samples), ("matrix", arguments.matrix_samples)]:
+        if used_function in arguments.functions:
+            all_cases += create_cases([used_function], used_samples, arguments.variables, arguments.kinds,
+                                      arguments.engines, arguments.jobs, {"group": 10 ** 6, "matrix": 1000},
+                                      arguments.memory_limit)
+
+    results = []
+    for index, used_case in enumerate(all_cases):
+        print(index + 1, len(all_cases), used_case)
+        results.append(run_case(used_case, arguments.seed, arguments.warmups, arguments.repeats))
+        save_records(results, arguments.output)  # save the progress after each case.
@@ -1,7 +1,15 @@
-from numpy import random, zeros, sum, abs, all
+from asyncio import run, gather, sleep, ensure_future, CancelledError
+from numpy import array, random, zeros, sum, abs, all, concatenate, save, argsort, flatnonzero
+from numpy import take_along_axis, arange, triu_indices, delete, minimum, where, uint8, uint16, float32
+from json import dump, load
+from os import environ
+from os.path import join, exists
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
-from calculator import hamming_group, hamming_matrix
+from calculator import hamming_group, hamming_matrix, hamming_stream, hamming_topk, hamming_within, hamming_batch
+from calculator import hamming_pairs, hamming_matrix_file, encode_sequences, DistanceMatrix, HammingIndex
+from calculator import MultiIndexHashing, HammingService, Profiler, calibrate, select_engine
 
 
 class TestBinaryGroup(TestCase):
@@ -25,6 +33,35 @@ class TestBinaryGroup(TestCase):
             self.assertEqual(all(requested_distances == predicted_distances), True)
 
 
+class TestPackedGroup(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 100
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            sample = random.randint(0, 2, size=(100,)).astype(bool)
+            # 200 samples, each sample contains 100 bool variables (not the multiple of 64).
+            sample_group = random.randint(0, 2, size=(200, 100)).astype(bool)
+            requested_distances = hamming_group(observed_sample=sample.astype(int),
+                                                sample_group=sample_group.astype(int), engine="dense")
+
+            predicted_distances = hamming_group(observed_sample=sample, sample_group=sample_group, engine="packed")
+
+            self.assertEqual(all(requested_distances == predicted_distances), True)
+
+            # the non-binary samples cannot be packed.
+            with self.assertRaises(ValueError):
+                hamming_group(observed_sample=sample.astype(int) * 2, sample_group=sample_group, engine="packed")
+
+            # the padded words cannot hide the different variable numbers.
+            with self.assertRaises(ValueError):
+                hamming_group(observed_sample=sample[:90], sample_group=sample_group, engine="packed")
+            with self.assertRaises(ValueError):
+                hamming_matrix(samples=sample_group[:, :90], other_samples=sample_group)
+
+
 class TestIntegerGroup(TestCase):
 
     def setUp(self):
@@ -45,6 +82,11 @@ class TestIntegerGroup(TestCase):
 
             self.assertEqual(all(requested_distances == predicted_distances), True)
 
+            # the nested lists are accepted as the samples.
+            predicted_distances = hamming_group(observed_sample=sample.tolist(), sample_group=sample_group.tolist())
+
+            self.assertEqual(all(requested_distances == predicted_distances), True)
+
 
 class TestRealGroup(TestCase):
 
@@ -69,6 +111,12 @@ class TestRealGroup(TestCase):
 
             self.assertEqual(all(requested_distances == predicted_distances), True)
 
+            # the small memory budget splits the sample group into many chunks.
+            predicted_distances = hamming_group(observed_sample=sample, sample_group=sample_group,
+                                                threshold=self.threshold, memory_limit=2 ** 14)
+
+            self.assertEqual(all(requested_distances == predicted_distances), True)
+
 
 class TestBinaryMatrix(TestCase):
 
@@ -92,6 +140,26 @@ class TestBinaryMatrix(TestCase):
             self.assertEqual(all(requested_matrix == predicted_matrix), True)
 
 
+class TestPackedMatrix(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            # 200 samples, each sample contains 130 bool variables (not the multiple of 64).
+            samples_1 = random.randint(0, 2, size=(200, 130)).astype(bool)
+            # 300 samples, each sample contains 130 bool variables (not the multiple of 64).
+            samples_2 = random.randint(0, 2, size=(300, 130)).astype(bool)
+            requested_matrix = hamming_matrix(samples=samples_1.astype(int),
+                                              other_samples=samples_2.astype(int), engine="dense")
+
+            predicted_matrix = hamming_matrix(samples=samples_1, other_samples=samples_2, engine="packed")
+
+            self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+
 class TestIntegerMatrix(TestCase):
 
     def setUp(self):
@@ -159,3 +227,679 @@ class TestWithMatrix(TestCase):
             predicted_matrix = hamming_matrix(samples=samples_1, other_samples=samples_2, threshold=None)
 
             self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+
+class TestTiledMatrix(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+        self.threshold = 0.5
+
+    # noinspection PyTypeChecker, PyArgumentList
+    def test(self):
+        for _ in range(self.repeat_time):
+            # 50 samples, each sample contains 20 real number variables (value belongs to 0 ~ 1).
+            samples_1 = random.random(size=(50, 20))
+            # 70 samples, each sample contains 20 real number variables (value belongs to 0 ~ 1).
+            samples_2 = random.random(size=(70, 20))
+            requested_matrix = zeros(shape=(len(samples_1), len(samples_2)), dtype=int)
+            for position_1 in range(len(samples_1)):
+                for position_2 in range(len(samples_2)):
+                    values = abs(samples_1[position_1] - samples_2[position_2])
+                    requested_matrix[position_1, position_2] = len(values[values > self.threshold])
+
+            # the tile side does not divide the sample numbers.
+            predicted_matrix = hamming_matrix(samples=samples_1, other_samples=samples_2, threshold=self.threshold,
+                                              block_size=7)
+
+            self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+
+class TestParallelGroup(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            sample = random.randint(0, 50, size=(100,))
+            # 1000 samples, each sample contains 100 integer variables (value belongs to 0 ~ 49).
+            sample_group = random.randint(0, 50, size=(1000, 100))
+            requested_distances = hamming_group(observed_sample=sample, sample_group=sample_group)
+
+            predicted_distances = hamming_group(observed_sample=sample, sample_group=sample_group, n_jobs=4)
+
+            self.assertEqual(all(requested_distances == predicted_distances), True)
+
+
+class TestParallelMatrix(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            # 200 samples, each sample contains 100 bool variables.
+            samples = random.randint(0, 2, size=(200, 100))
+            requested_matrix = hamming_matrix(samples=samples, engine="dense")
+
+            predicted_matrix = hamming_matrix(samples=samples, block_size=16, n_jobs=4)
+
+            self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+
+class TestCondensedMatrix(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            # 100 samples, each sample contains 100 integer variables (value belongs to 0 ~ 49).
+            samples = random.randint(0, 50, size=(100, 100))
+            requested_matrix = []
+            for position_1 in range(len(samples) - 1):
+                for position_2 in range(position_1 + 1, len(samples)):
+                    requested_matrix.append(sum(samples[position_1] != samples[position_2]))
+
+            predicted_matrix = hamming_matrix(samples=samples, block_size=16, condensed=True)
+
+            self.assertEqual(all(array(requested_matrix) == predicted_matrix), True)
+
+
+class TestStreamGroup(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            sample = random.randint(0, 50, size=(100,))
+            # 1000 samples, each sample contains 100 integer variables (value belongs to 0 ~ 49).
+            sample_group = random.randint(0, 50, size=(1000, 100))
+            requested_distances = hamming_group(observed_sample=sample, sample_group=sample_group)
+
+            with TemporaryDirectory() as folder:
+                save(join(folder, "group.npy"), sample_group)
+                predicted_distances = concatenate(list(hamming_stream(observed_sample=sample,
+                                                                      sample_group=join(folder, "group.npy"),
+                                                                      chunk_size=64)))
+            self.assertEqual(all(requested_distances == predicted_distances), True)
+
+            # iterable of row chunks with different sizes.
+            chunks = (sample_group[start: start + 300] for start in range(0, len(sample_group), 300))
+            predicted_distances = concatenate(list(hamming_stream(observed_sample=sample, sample_group=chunks,
+                                                                  chunk_size=128)))
+            self.assertEqual(all(requested_distances == predicted_distances), True)
+
+            # nested list of variables is the sample group, instead of the row chunks.
+            predicted_distances = concatenate(list(hamming_stream(observed_sample=sample.tolist(),
+                                                                  sample_group=sample_group.tolist(), chunk_size=128)))
+            self.assertEqual(all(requested_distances == predicted_distances), True)
+
+            indices, distances = hamming_topk(observed_sample=sample.tolist(), sample_group=sample_group.tolist(), k=5)
+            self.assertEqual(all(requested_distances[indices] == distances), True)
+
+            indices, distances = hamming_within(observed_sample=sample.tolist(), sample_group=sample_group.tolist(),
+                                                radius=98)
+            self.assertEqual(all(flatnonzero(requested_distances <= 98) == indices), True)
+
+
+class TestNearestGroup(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+        self.k = 10
+        self.radius = 40
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            sample = random.randint(0, 2, size=(100,))
+            # 1000 samples, each sample contains 100 bool variables.
+            sample_group = random.randint(0, 2, size=(1000, 100))
+            distances = hamming_group(observed_sample=sample, sample_group=sample_group)
+
+            # the stable sort prefers the smaller index for the ties.
+            requested_indices = argsort(distances, kind="stable")[:self.k]
+            predicted_indices, predicted_distances = hamming_topk(observed_sample=sample, sample_group=sample_group,
+                                                                  k=self.k, chunk_size=64)
+            self.assertEqual(all(requested_indices == predicted_indices), True)
+            self.assertEqual(all(distances[requested_indices] == predicted_distances), True)
+
+            requested_indices = flatnonzero(distances <= self.radius)
+            predicted_indices, predicted_distances = hamming_within(observed_sample=sample, sample_group=sample_group,
+                                                                    radius=self.radius, chunk_size=64)
+            self.assertEqual(all(requested_indices == predicted_indices), True)
+            self.assertEqual(all(distances[requested_indices] == predicted_distances), True)
+
+
+class TestBatchGroup(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+        self.k = 10
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            # 20 observed samples, each sample contains 100 integer variables (value belongs to 0 ~ 4).
+            samples = random.randint(0, 5, size=(20, 100))
+            # 1000 samples, each sample contains 100 integer variables (value belongs to 0 ~ 4).
+            sample_group = random.randint(0, 5, size=(1000, 100))
+            requested_matrix = array([hamming_group(observed_sample=sample, sample_group=sample_group)
+                                      for sample in samples])
+
+            predicted_matrix = hamming_batch(observed_samples=samples, sample_group=sample_group, chunk_size=128)
+            self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+            # the stable sort prefers the smaller index for the ties.
+            requested_indices = argsort(requested_matrix, axis=1, kind="stable")[:, :self.k]
+            predicted_indices, predicted_distances = hamming_batch(observed_samples=samples, sample_group=sample_group,
+                                                                   k=self.k, chunk_size=128)
+            self.assertEqual(all(requested_indices == predicted_indices), True)
+            self.assertEqual(all(take_along_axis(requested_matrix, requested_indices, axis=1) == predicted_distances),
+                             True)
+
+
+class TestIndexGroup(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+        self.k = 10
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            for maximum in [2, 50]:  # bool variables for "packed" engine and integer variables for "dense" engine.
+                samples = random.randint(0, maximum, size=(20, 100))
+                sample_group = random.randint(0, maximum, size=(1000, 100))
+                other_group = random.randint(0, maximum, size=(100, 100))
+                index = HammingIndex(sample_group=sample_group[:500], block_size=32)
+                index.add(samples=other_group)
+                index.add(samples=sample_group[500:])
+                index.remove(indices=arange(500, 600))
+
+                with TemporaryDirectory() as folder:
+                    index.save(path=folder)
+                    index = HammingIndex.load(path=folder, block_size=32)
+
+                    requested_matrix = hamming_matrix(samples=samples, other_samples=sample_group)
+                    self.assertEqual(all(requested_matrix == index.batch_query(observed_samples=samples)), True)
+                    self.assertEqual(all(requested_matrix[0] == index.query(observed_sample=samples[0])), True)
+
+                    requested_indices = argsort(requested_matrix[0], kind="stable")[:self.k]
+                    predicted_indices, predicted_distances = index.topk(observed_sample=samples[0], k=self.k)
+                    self.assertEqual(all(requested_indices == predicted_indices), True)
+                    self.assertEqual(all(requested_matrix[0, requested_indices] == predicted_distances), True)
+                    del index  # release the memory-mapped file before the folder is removed.
+
+
+class TestHashingGroup(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            sample_group = random.randint(0, 2, size=(1000, 100))
+            # some samples near the observed sample, so that the small radius has results.
+            sample_group[:100] = sample_group[0] ^ (random.random(size=(100, 100)) < 0.05)
+            searcher = MultiIndexHashing(sample_group=sample_group)
+            for radius in [0, 3, 10, 60]:  # the largest radius falls back to the linear scan.
+                requested_indices, requested_distances = hamming_within(observed_sample=sample_group[0],
+                                                                        sample_group=sample_group, radius=radius)
+                predicted_indices, predicted_distances = searcher.within(observed_sample=sample_group[0], radius=radius)
+                self.assertEqual(all(requested_indices == predicted_indices), True)
+                self.assertEqual(all(requested_distances == predicted_distances), True)
+
+            # the non-binary observed sample cannot be packed.
+            with self.assertRaises(ValueError):
+                searcher.within(observed_sample=sample_group[0] * 2, radius=1)
+
+            # the observed sample should have the indexed variable number.
+            with self.assertRaises(ValueError):
+                searcher.within(observed_sample=sample_group[0, :80], radius=1)
+
+
+class TestCompactOutput(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+        self.threshold = 0.5
+
+    # noinspection PyTypeChecker, PyArgumentList
+    def test(self):
+        for _ in range(self.repeat_time):
+            sample = random.random(size=(100,))
+            # 200 samples, each sample contains 100 real number variables (value belongs to 0 ~ 1).
+            sample_group = random.random(size=(200, 100))
+            requested_distances = hamming_group(observed_sample=sample, sample_group=sample_group,
+                                                threshold=self.threshold)
+            predicted_distances = hamming_group(observed_sample=sample, sample_group=sample_group,
+                                                threshold=self.threshold, dtype=uint8)
+            self.assertEqual(predicted_distances.dtype, uint8)
+            self.assertEqual(all(requested_distances == predicted_distances), True)
+
+            requested_matrix = hamming_matrix(samples=sample_group, threshold=self.threshold)
+            buffer = zeros(shape=(200, 200), dtype=uint16)
+            for _ in range(2):  # the buffer is reused for the repeated calls.
+                predicted_matrix = hamming_matrix(samples=sample_group, threshold=self.threshold, block_size=32,
+                                                  out=buffer)
+                self.assertEqual(predicted_matrix is buffer, True)
+                self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+            buffer = zeros(shape=(200 * 199 // 2,), dtype=uint8)
+            predicted_matrix = hamming_matrix(samples=sample_group, threshold=self.threshold, block_size=32,
+                                              condensed=True, out=buffer)
+            self.assertEqual(all(requested_matrix[triu_indices(200, 1)] == predicted_matrix), True)
+
+        # the distance of 300 variables may overflow the unsigned 8-bit integer.
+        with self.assertRaises(ValueError):
+            hamming_matrix(samples=random.randint(0, 2, size=(10, 300)), dtype=uint8)
+
+
+class TestFileMatrix(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            # 100 samples, each sample contains 100 integer variables (value belongs to 0 ~ 49).
+            samples_1 = random.randint(0, 50, size=(100, 100))
+            # 70 samples, each sample contains 100 integer variables (value belongs to 0 ~ 49).
+            samples_2 = random.randint(0, 50, size=(70, 100))
+
+            with TemporaryDirectory() as folder:
+                path = join(folder, "matrix.npy")
+                for other_samples in [None, samples_2]:
+                    requested_matrix = hamming_matrix(samples=samples_1, other_samples=other_samples)
+                    predicted_matrix = hamming_matrix_file(path=path, samples=samples_1, other_samples=other_samples,
+                                                           block_size=16)
+                    self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+                    # simulate the interruption after the first 32 rows.
+                    with open(path + ".checkpoint", "r") as file:
+                        checkpoint = load(file)
+                    checkpoint["completed"] = 32
+                    with open(path + ".checkpoint", "w") as file:
+                        dump(checkpoint, file)
+                    if other_samples is None:
+                        predicted_matrix[32:, 32:] = 0
+                    else:
+                        predicted_matrix[32:] = 0
+                    del predicted_matrix
+
+                    predicted_matrix = hamming_matrix_file(path=path, samples=samples_1, other_samples=other_samples,
+                                                           block_size=16)
+                    self.assertEqual(all(requested_matrix == predicted_matrix), True)
+                    del predicted_matrix
+
+                requested_matrix = hamming_matrix(samples=samples_1, condensed=True)
+                predicted_matrix = hamming_matrix_file(path=path, samples=samples_1, block_size=16, condensed=True)
+                self.assertEqual(all(requested_matrix == predicted_matrix), True)
+                del predicted_matrix
+
+                # the changed samples with the same shape are calculated again instead of the completed matrix.
+                samples_3 = random.randint(0, 50, size=(100, 100))
+                requested_matrix = hamming_matrix(samples=samples_3, condensed=True)
+                predicted_matrix = hamming_matrix_file(path=path, samples=samples_3, block_size=16, condensed=True)
+                self.assertEqual(all(requested_matrix == predicted_matrix), True)
+                del predicted_matrix
+
+
+class TestPairsMatrix(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+        self.max_distance = 40
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            # 100 samples, each sample contains 100 bool variables.
+            samples_1 = random.randint(0, 2, size=(100, 100))
+            # 70 samples, each sample contains 100 bool variables.
+            samples_2 = random.randint(0, 2, size=(70, 100))
+
+            requested_matrix = hamming_matrix(samples=samples_1)
+            requested_rows, requested_columns = ((requested_matrix <= self.max_distance)
+                                                 & (arange(100).reshape(1, -1) > arange(100).reshape(-1, 1))).nonzero()
+            predicted_rows, predicted_columns, predicted_distances = hamming_pairs(samples=samples_1,
+                                                                                   max_distance=self.max_distance,
+                                                                                   block_size=16)
+            self.assertEqual(all(requested_rows == predicted_rows), True)
+            self.assertEqual(all(requested_columns == predicted_columns), True)
+            self.assertEqual(all(requested_matrix[requested_rows, requested_columns] == predicted_distances), True)
+
+            requested_matrix = hamming_matrix(samples=samples_1, other_samples=samples_2)
+            requested_rows, requested_columns = (requested_matrix <= self.max_distance).nonzero()
+            predicted_rows, predicted_columns, predicted_distances = hamming_pairs(samples=samples_1,
+                                                                                   other_samples=samples_2,
+                                                                                   max_distance=self.max_distance,
+                                                                                   block_size=16)
+            self.assertEqual(all(requested_rows == predicted_rows), True)
+            self.assertEqual(all(requested_columns == predicted_columns), True)
+            self.assertEqual(all(requested_matrix[requested_rows, requested_columns] == predicted_distances), True)
+
+
+class TestSingleRealMatrix(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+        self.threshold = 0.5
+
+    # noinspection PyTypeChecker, PyArgumentList
+    def test(self):
+        for _ in range(self.repeat_time):
+            # 200 samples, each sample contains 100 single-precision real number variables (value belongs to 0 ~ 1).
+            samples = random.random(size=(200, 100)).astype(float32)
+            requested_matrix = zeros(shape=(len(samples), len(samples)), dtype=int)
+            for position_1 in range(len(samples)):
+                for position_2 in range(len(samples)):
+                    values = abs(samples[position_1] - samples[position_2])  # calculated in single precision.
+                    requested_matrix[position_1, position_2] = len(values[values > float32(self.threshold)])
+
+            predicted_matrix = hamming_matrix(samples=samples, threshold=self.threshold, block_size=32)
+
+            self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+            # the unsigned integer variables with threshold.
+            samples = random.randint(0, 10, size=(200, 100)).astype(uint8)
+            requested_matrix = hamming_matrix(samples=samples.astype(int), threshold=2)
+            predicted_matrix = hamming_matrix(samples=samples, threshold=2, block_size=32)
+
+            self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+
+class TestSequenceMatrix(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+        self.alphabet = "ACGT"
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            # 100 DNA sequences, each sequence contains 150 nucleotides.
+            codes = random.randint(0, 4, size=(100, 150))
+            sequences = ["".join([self.alphabet[code] for code in sample]) for sample in codes]
+            requested_matrix = hamming_matrix(samples=codes, engine="dense")
+
+            predicted_matrix = hamming_matrix(samples=encode_sequences(sequences, alphabet=self.alphabet))
+            self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+            predicted_matrix = hamming_matrix(samples=sequences, block_size=16)  # byte-wise comparison.
+            self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+            predicted_distances = hamming_group(observed_sample=sequences[0], sample_group=sequences[1:])
+            self.assertEqual(all(requested_matrix[0, 1:] == predicted_distances), True)
+
+            predicted_distances = HammingIndex(sample_group=sequences[1:]).query(observed_sample=sequences[0])
+            self.assertEqual(all(requested_matrix[0, 1:] == predicted_distances), True)
+
+            with TemporaryDirectory() as folder:
+                with open(join(folder, "group.dat"), "wb") as file:  # the path without '.npy' suffix.
+                    save(file, codes)
+                predicted_distances = concatenate(list(hamming_stream(observed_sample=codes[0],
+                                                                      sample_group=join(folder, "group.dat"))))
+            self.assertEqual(all(requested_matrix[0] == predicted_distances), True)
+
+            # the small integer variables (value belongs to 0 ~ 15).
+            samples = random.randint(0, 16, size=(100, 150)).astype(uint8)
+            requested_matrix = hamming_matrix(samples=samples, engine="dense")
+            predicted_matrix = hamming_matrix(samples=samples, engine="sliced", block_size=16)
+            self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+            index = HammingIndex(sample_group=samples[1:])
+            self.assertEqual(all(requested_matrix[0, 1:] == index.query(observed_sample=samples[0])), True)
+
+            # the group is compared directly, only the index and the wide matrix are sliced.
+            self.assertEqual(index.engine == "sliced", True)
+            self.assertEqual(select_engine(None, None, samples[0], samples) == "dense", True)
+            self.assertEqual(select_engine(None, None, samples) == "dense", True)
+            self.assertEqual(select_engine(None, None, samples.repeat(2, axis=1)) == "sliced", True)
+
+
+class TestDynamicMatrix(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+        self.update_time = 20
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            # 50 samples at first, each sample contains 100 integer variables (value belongs to 0 ~ 49).
+            samples = random.randint(0, 50, size=(50, 100))
+            distance_matrix = DistanceMatrix(samples=samples, block_size=16)
+            for _ in range(self.update_time):
+                if random.random() < 0.6:
+                    added_samples = random.randint(0, 50, size=(random.randint(1, 10), 100))
+                    samples = concatenate((samples, added_samples))
+                    distance_matrix.append(samples=added_samples)
+                else:
+                    indices = random.choice(len(samples), size=random.randint(1, 10), replace=False)
+                    samples = delete(samples, indices, axis=0)
+                    distance_matrix.remove(indices=indices)
+
+                requested_matrix = hamming_matrix(samples=samples)
+                self.assertEqual(all(requested_matrix == distance_matrix.matrix), True)
+                self.assertEqual(all(samples == distance_matrix.samples), True)
+
+
+class TestBoundedMatrix(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+        self.max_distance = 300
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            # 100 samples, each sample contains 1000 binary variables, half of them are close to the others.
+            samples = random.randint(0, 2, size=(100, 1000))
+            samples[50:] = samples[:50] ^ (random.random(size=(50, 1000)) < 0.2)
+            for engine in ["dense", "packed"]:
+                requested_matrix = minimum(hamming_matrix(samples=samples, engine=engine), self.max_distance + 1)
+                predicted_matrix = hamming_matrix(samples=samples, engine=engine, block_size=16,
+                                                  max_distance=self.max_distance)
+                self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+                predicted_distances = hamming_group(observed_sample=samples[0], sample_group=samples, engine=engine,
+                                                    max_distance=self.max_distance)
+                self.assertEqual(all(requested_matrix[0] == predicted_distances), True)
+
+            # 100 samples, each sample contains 1000 real number variables (value belongs to 0 ~ 1).
+            samples = random.random(size=(100, 1000))
+            requested_matrix = minimum(hamming_matrix(samples=samples, threshold=0.5), self.max_distance + 1)
+            predicted_matrix = hamming_matrix(samples=samples, threshold=0.5, max_distance=self.max_distance)
+            self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+
+class TestProfiledMatrix(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            # 100 samples, each sample contains 100 binary (or real number) variables.
+            binary_samples = random.randint(0, 2, size=(100, 100))
+            real_samples = random.random(size=(100, 100))
+            received = []
+            with TemporaryDirectory() as folder:
+                with Profiler(callback=received.append) as profiler:
+                    requested_matrix = hamming_matrix(samples=binary_samples, block_size=16, n_jobs=2)
+                    hamming_group(observed_sample=real_samples[0], sample_group=real_samples, threshold=0.5)
+                hamming_matrix(samples=binary_samples)  # not recorded outside the context.
+                profiler.save(join(folder, "profile.json"))
+                with open(join(folder, "profile.json"), "r") as file:
+                    records = load(file)["records"]
+
+            self.assertEqual(all(requested_matrix == hamming_matrix(samples=binary_samples)), True)
+            self.assertEqual(len(records) == 2 and received == profiler.records, True)
+            self.assertEqual(records[0]["engine"] == "packed" and records[1]["engine"] == "dense", True)
+            self.assertEqual(records[0]["inputs"]["samples"]["shape"] == [100, 100], True)
+            self.assertEqual(sorted(records[0]["phases"]) == ["compare", "encode", "reduce"], True)
+            self.assertEqual(sorted(records[1]["phases"]) == ["compare", "reduce", "threshold"], True)
+            self.assertEqual(records[0]["allocated_bytes"] >= requested_matrix.nbytes, True)
+
+
+class TestAutoEngine(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+
+    # noinspection PyTypeChecker
+    def test(self):
+        with TemporaryDirectory() as folder:
+            previous, environ["XDG_CACHE_HOME"] = environ.get("XDG_CACHE_HOME"), folder
+            try:
+                calibration = calibrate()
+                self.assertEqual(exists(join(folder, "faster_hamming", "calibration.json")), True)
+                self.assertEqual(calibrate(path=join(folder, "faster_hamming", "calibration.json")) == calibration,
+                                 True)
+
+                # the calibration of the older cost model (without the version) is made again.
+                with open(join(folder, "outdated.json"), "w") as file:
+                    dump({"machine": calibration["machine"], "engines": {}}, file)
+                self.assertEqual(calibrate(path=join(folder, "outdated.json"))["engines"].keys()
+                                 == calibration["engines"].keys(), True)
+
+                for _ in range(self.repeat_time):
+                    # 100 samples, each sample contains 100 binary, small integer or real number variables.
+                    for samples, threshold in [(random.randint(0, 2, size=(100, 100)), None),
+                                               (random.randint(0, 8, size=(100, 100)), None),
+                                               (random.randint(0, 50, size=(100, 100)), None),
+                                               (random.random(size=(100, 100)), 0.5)]:
+                        requested_matrix = hamming_matrix(samples=samples, threshold=threshold, engine="dense")
+                        predicted_matrix = hamming_matrix(samples=samples, threshold=threshold, engine="auto")
+                        self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+                        predicted_distances = hamming_group(observed_sample=samples[0], sample_group=samples,
+                                                            threshold=threshold, engine="auto")
+                        self.assertEqual(all(requested_matrix[0] == predicted_distances), True)
+            finally:
+                if previous is None:
+                    del environ["XDG_CACHE_HOME"]
+                else:
+                    environ["XDG_CACHE_HOME"] = previous
+
+
+class TestServiceGroup(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+        self.query_number = 50
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            # 1000 samples, each sample contains 100 binary variables.
+            sample_group = random.randint(0, 2, size=(1000, 100))
+            samples = random.randint(0, 2, size=(self.query_number, 100))
+            service = HammingService(sample_group=sample_group, window=0.01, max_batch=20, max_pending=30)
+
+            async def serve():
+                tasks = [service.query(observed_sample=sample) for sample in samples]
+                nearest = service.query(observed_sample=samples[0], k=3)
+
+                async def cancel():
+                    cancelled = ensure_future(service.query(observed_sample=samples[0]))
+                    await sleep(0)
+                    cancelled.cancel()
+                    try:
+                        await cancelled
+                    except CancelledError:
+                        return True
+                    return False
+
+                async def mix():
+                    valid = ensure_future(service.query(observed_sample=samples[1]))
+                    try:
+                        await service.query(observed_sample=samples[1] * 2)  # not binary for the packed index.
+                    except ValueError:
+                        return await valid  # the invalid query does not fail the valid one.
+
+                return await gather(gather(*tasks), nearest, cancel(), mix())
+
+            predicted_distances, (indices, distances), cancelled, mixed_distances = run(serve())
+            for sample, distances_1 in zip(samples, predicted_distances):
+                distances_2 = hamming_group(observed_sample=sample, sample_group=sample_group)
+                self.assertEqual(all(distances_1 == distances_2), True)
+
+            requested_distances = hamming_group(observed_sample=samples[0], sample_group=sample_group)
+            self.assertEqual(all(requested_distances[indices] == distances), True)
+            self.assertEqual(all(distances == sorted(requested_distances)[:3]), True)
+            self.assertEqual(cancelled, True)
+            self.assertEqual(all(mixed_distances == predicted_distances[1]), True)
+            self.assertEqual(service.batch_number < self.query_number, True)  # the queries are coalesced.
+
+
+class TestMaskedMatrix(TestCase):
+
+    def setUp(self):
+        self.repeat_time = 10
+        self.missing_rate = 0.05
+
+    # noinspection PyTypeChecker
+    def test(self):
+        for _ in range(self.repeat_time):
+            # 100 (and 50) genotype samples, each sample contains 500 variables (value belongs to 0 ~ 2).
+            samples_1, samples_2 = random.randint(0, 3, size=(100, 500)), random.randint(0, 3, size=(50, 500))
+            masks_1 = random.random(size=samples_1.shape) > self.missing_rate
+            masks_2 = random.random(size=samples_2.shape) > self.missing_rate
+            weights = random.randint(1, 5, size=(500,))
+            requested_matrix = zeros(shape=(len(samples_1), len(samples_2)), dtype=int)
+            for position_1 in range(len(samples_1)):
+                for position_2 in range(len(samples_2)):
+                    flags = (samples_1[position_1] != samples_2[position_2]) & masks_1[position_1] & masks_2[position_2]
+                    requested_matrix[position_1, position_2] = sum(flags * weights)
+
+            predicted_matrix = hamming_matrix(samples=samples_1, other_samples=samples_2, block_size=16,
+                                              weights=weights, masks=masks_1, other_masks=masks_2)
+            self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+            # any non-zero value of the masks refers to the valid variable.
+            predicted_matrix = hamming_matrix(samples=samples_1, other_samples=samples_2, block_size=16,
+                                              weights=weights, masks=masks_1.astype(int), other_masks=masks_2 * 0.5)
+            self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+            predicted_distances = hamming_group(observed_sample=samples_2[0], sample_group=samples_1, weights=weights,
+                                                observed_mask=masks_2[0], group_mask=masks_1, n_jobs=2)
+            self.assertEqual(all(requested_matrix[:, 0] == predicted_distances), True)
+
+            # the unweighted distances with the packed masks, and the early exit.
+            requested_matrix = hamming_matrix(samples=samples_1 * 0 + 1, other_samples=samples_1 * 0,
+                                              masks=masks_1, other_masks=masks_1, engine="dense")
+            requested_matrix = where(requested_matrix > 400, 401, requested_matrix)
+            for engine in ["dense", "sliced"]:
+                predicted_matrix = hamming_matrix(samples=samples_1 * 0 + 1, other_samples=samples_1 * 0,
+                                                  masks=masks_1, other_masks=masks_1, engine=engine, max_distance=400)
+                self.assertEqual(all(requested_matrix == predicted_matrix), True)
+
+            requested_matrix = hamming_matrix(samples=samples_1, masks=masks_1, engine="dense")
+            predicted_matrix = hamming_matrix(samples=samples_1, masks=masks_1, engine="sliced", condensed=True)
+            self.assertEqual(all(requested_matrix[triu_indices(len(samples_1), 1)] == predicted_matrix), True)
+
+            # the real number weights.
+            weights = random.random(size=(500,))
+            requested_matrix = hamming_matrix(samples=samples_1, masks=masks_1, weights=weights, engine="dense")
+            for position in range(len(samples_1)):
+                flags = (samples_1[position] != samples_1) & masks_1[position] & masks_1
+                self.assertEqual(all(abs(requested_matrix[position] - sum(flags * weights, axis=1)) < 1e-9), True)
+
+            # the different variable numbers are rejected, instead of cutting the wider samples in the blocks.
+            with self.assertRaises(ValueError):
+                hamming_matrix(samples=samples_1[:, :490], other_samples=samples_2, engine="dense")
+            with self.assertRaises(ValueError):
+                hamming_group(observed_sample=samples_2[0, :490], sample_group=samples_1, engine="dense")
@@ -1,16 +1,47 @@
+from argparse import ArgumentParser
+from json import load
 from matplotlib import pyplot, patches
-from numpy import load, median, min, max, log10
+from numpy import median, min, max, log10
 
 
-used_colors = [["#FE817D", "#FCBBAE"], ["#81B8DF", "#B1CCDF"]]
-labels = ["customized", "numpy.sum"]
+used_colors = [["#FE817D", "#FCBBAE"], ["#81B8DF", "#B1CCDF"], ["#8FC79A", "#C5E0C9"]]
 
-if __name__ == "__main__":
-    bias = [-0.25, 0.25]
-    data = load("result.2.npy")
-    for data_index in range(4):
-        for bias_index in range(2):
-            used_data = data[data_index, bias_index]
+
+def draw(records, function, variable_number, kind, engines, path):
+    """
+    Draw the wall times of benchmark records (from 'comparison.py') for different sample numbers.
+
+    :param records: benchmark records.
+    :type records: list
+
+    :param function: benchmarked function, "group" or "matrix".
+    :type function: str
+
+    :param variable_number: variable number of the drawn records.
+    :type variable_number: int
+
+    :param kind: data kind of the drawn records, "bool", "small", "int" or "float".
+    :type kind: str
+
+    :param engines: drawn engines, at most 3.
+    :type engines: list
+
+    :param path: path of the outputted figure.
+    :type path: str
+    """
+    records = [record for record in records if record["function"] == function and record["n_jobs"] == 1
+               and record["variable_number"] == variable_number and record["kind"] == kind]
+    sample_numbers = sorted(set([record["sample_number"] for record in records]))
+    bias = [(index - (len(engines) - 1) / 2) * 0.3 for index in range(len(engines))]
+
+    pyplot.figure(figsize=(10, 5), tight_layout=True)
+    for data_index, sample_number in enumerate(sample_numbers):
+        for bias_index, engine in enumerate(engines):
+            used_data = [record["wall_times"] for record in records
+                         if record["sample_number"] == sample_number and record["engine"] == engine]
+            if len(used_data) == 0:
+                continue
+            used_data = used_data[0]
             if min(used_data) > 1e-10:
                 used_data = log10(used_data)
                 if max(used_data) - min(used_data) < 0.02:
@@ -21,7 +52,7 @@ if __name__ == "__main__":
                                    color="white", edgecolor=used_colors[bias_index][0], linewidth=1, s=20, zorder=4)
                 else:
                     violin = pyplot.violinplot(dataset=used_data, positions=[data_index + bias[bias_index]],
-                                               bw_method=0.5, showextrema=False, widths=0.3)
+                                               bw_method=0.5, showextrema=False, widths=0.25)
                     for patch in violin["bodies"]:
                         patch.set_edgecolor(used_colors[bias_index][0])
                         patch.set_facecolor(used_colors[bias_index][1])
@@ -30,68 +61,39 @@ if __name__ == "__main__":
                     pyplot.scatter([data_index + bias[bias_index]], median(used_data),
                                    color="white", edgecolor=used_colors[bias_index][0], linewidth=1, s=40, zorder=4)
             else:
-                pyplot.scatter([data_index + bias[bias_index]], [-2],
+                pyplot.scatter([data_index + bias[bias_index]], [-4],
                                color=used_colors[bias_index][0], marker="x", s=60)
 
         if data_index % 2 != 0:
-            pyplot.fill_between([data_index - 0.5, data_index + 0.5], [-2.2, -2.2], [3.2, 3.2],
+            pyplot.fill_between([data_index - 0.5, data_index + 0.5], [-4.2, -4.2], [3.2, 3.2],
                                 color="#F1F1F1", zorder=0)
 
     legends = [patches.Patch(facecolor=used_colors[index][1], edgecolor=used_colors[index][0],
-                             linewidth=1, label=labels[index]) for index in range(2)]
+                             linewidth=1, label=engine) for index, engine in enumerate(engines)]
     pyplot.legend(handles=legends, loc="upper left", fontsize=12)
 
-    pyplot.xlabel("different number of samples with 20 variables", fontsize=12)
-    pyplot.xlim(-0.5, 3.5)
-    pyplot.xticks([0, 1, 2, 3], [r"$500$", r"$1000$", r"$5000$", r"$10000$"], fontsize=12)
+    pyplot.xlabel("different number of samples with " + str(variable_number) + " variables", fontsize=12)
+    pyplot.xlim(-0.5, len(sample_numbers) - 0.5)
+    pyplot.xticks(range(len(sample_numbers)), [str(value) for value in sample_numbers], fontsize=12)
     pyplot.ylabel("seconds spent", fontsize=12)
-    pyplot.ylim(-2.2, 3.2)
-    pyplot.yticks([-2, -1, 0, 1, 2, 3],
-                  ["$10^{-2}$", "$10^{-1}$", "$10^0$", "$10^1$", "$10^2$", "$10^3$"], fontsize=12)
+    pyplot.ylim(-4.2, 3.2)
+    pyplot.yticks([-4, -3, -2, -1, 0, 1, 2, 3],
+                  ["$10^{" + str(value) + "}$" for value in [-4, -3, -2, -1, 0, 1, 2, 3]], fontsize=12)
 
-    pyplot.savefig("result.2.svg", format="svg", bbox_inches="tight", dpi=600)
+    pyplot.savefig(path, format="svg", bbox_inches="tight", dpi=600)
     pyplot.close()
 
-    # pyplot.figure(figsize=(10, 5), tight_layout=True)
-    # bias = [-0.3, 0, 0.3]
-    # data = load("result.2.npy")
-    # for data_index in range(3):
-    #     for bias_index in range(3):
-    #         used_data = data[data_index, bias_index]
-    #         if min(used_data) > 1e-10:
-    #             used_data = log10(used_data)
-    #             if max(used_data) - min(used_data) < 0.02:
-    #                 result = median(used_data)
-    #                 pyplot.hlines(result, data_index + bias[bias_index] - 0.08, data_index + bias[bias_index] + 0.08,
-    #                               linewidths=1, edgecolors=used_colors[bias_index][0], zorder=3)
-    #                 pyplot.scatter([data_index + bias[bias_index]], result,
-    #                                color="white", edgecolor=used_colors[bias_index][0], linewidth=1, s=20, zorder=4)
-    #             else:
-    #                 violin = pyplot.violinplot(dataset=used_data, positions=[data_index + bias[bias_index]],
-    #                                            bw_method=0.5, showextrema=False, widths=0.16)
-    #                 for patch in violin["bodies"]:
-    #                     patch.set_edgecolor(used_colors[bias_index][0])
-    #                     patch.set_facecolor(used_colors[bias_index][1])
-    #                     patch.set_linewidth(1)
-    #                     patch.set_alpha(1)
-    #                 pyplot.scatter([data_index + bias[bias_index]], median(used_data),
-    #                                color="white", edgecolor=used_colors[bias_index][0], linewidth=1, s=20, zorder=4)
-    #         else:
-    #             pyplot.scatter([data_index + bias[bias_index]], [-2],
-    #                            color=used_colors[bias_index][0], marker="x", s=30)
-    #
-    #     if data_index % 2 != 0:
-    #         pyplot.fill_between([data_index - 0.5, data_index + 0.5], [-2.2, -2.2], [3.2, 3.2],
-    #                             color="#F1F1F1", zorder=0)
-    #
-    # legends = [patches.Patch(facecolor=used_colors[index][1], edgecolor=used_colors[index][0],
-    #                          linewidth=1, label=labels[index]) for index in range(3)]
-    # pyplot.legend(handles=legends, loc="upper left", fontsize=12)
-    #
-    # pyplot.xlabel("different number of samples with 100 variables", fontsize=12)
-    # pyplot.xlim(-0.5, 3.5)
-    # pyplot.xticks([0, 1, 2, 3], ["$10^1$", "$10^2$", "$10^3$", "$10^4$"], fontsize=12)
-    # pyplot.ylabel("average seconds spent", fontsize=12)
-    # pyplot.show()
-    # # pyplot.ylim(-2.2, 3.2)
-    # # pyplot.yticks([-2, -1, 0, 1, 2, 3], ["10^{-2}", "10^{-1}", "10^0", "10^1", "10^2", "10^3"], fontsize=12)
\ No newline at end of file
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="draw the benchmark results of 'comparison.py'.")
+    parser.add_argument("--input", default="benchmark.json", help="path of the JSON results.")
+    parser.add_argument("--variables", type=int, default=20, help="variable number of the drawn records.")
+    parser.add_argument("--kind", default="bool", help="data kind of the drawn records.")
+    parser.add_argument("--engines", nargs="+", default=["dense", "packed", "loop"])
+    arguments = parser.parse_args()
+
+    with open(arguments.input, "r") as file:
+        all_records = load(file)["records"]
+
+    draw(all_records, "group", arguments.variables, arguments.kind, arguments.engines, "result.1.svg")
+    draw(all_records, "matrix", arguments.variables, arguments.kind, arguments.engines, "result.2.svg")